@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.model import UserUsage
+from app.core.model import QuotaKind
+
+# Monthly balance and lifetime total columns of each quota
+QUOTA_COLUMNS = {
+    QuotaKind.papers: (
+        UserUsage.papers_created_balance_monthly,
+        UserUsage.total_papers_created,
+    ),
+    QuotaKind.submissions: (
+        UserUsage.submissions_made_balance_monthly,
+        UserUsage.total_submissions_made,
+    ),
+    QuotaKind.llm_tokens: (
+        UserUsage.llm_tokens_balance_monthly,
+        UserUsage.total_llm_tokens_used,
+    ),
+}
+
+
+@dataclass
+class QuotaResult:
+    allowed: bool
+    # None when the user has no usage row, i.e. is not metered
+    remaining: int | None
+
+
+class Quota:
+    """
+    Monthly usage balances checked and updated inside the database, so concurrent
+    requests cannot both spend the last unit. Both methods join the caller's
+    transaction; the caller commits.
+    """
+
+    @staticmethod
+    async def consume(
+        db: AsyncSession,
+        email: str,
+        kind: QuotaKind,
+        amount: int = 1,
+        count_usage: bool = True,
+    ) -> QuotaResult:
+        """
+        Take `amount` from the balance if it covers it, adding it to the lifetime total
+        unless `count_usage` is False (usage recorded later, e.g. on settlement).
+        """
+        balance, total = QUOTA_COLUMNS[kind]
+        changes = {balance.key: balance - amount}
+        if count_usage:
+            changes[total.key] = total + amount
+
+        res = await db.execute(
+            update(UserUsage)
+            .where(UserUsage.email == email, balance >= amount)
+            .values(changes)
+            .returning(balance)
+            .execution_options(synchronize_session=False)
+        )
+        remaining = res.scalar_one_or_none()
+        if remaining is not None:
+            return QuotaResult(allowed=True, remaining=remaining)
+
+        # Denied or unmetered; only this path needs a second look at the row.
+        res = await db.execute(select(balance).where(UserUsage.email == email))
+        remaining = res.scalar_one_or_none()
+        return QuotaResult(allowed=remaining is None, remaining=remaining)
+
+    @staticmethod
+    async def credit(
+        db: AsyncSession, email: str, kind: QuotaKind, amount: int, used: int = 0
+    ) -> None:
+        """Give `amount` back to the balance (negative to charge) and record `used`."""
+        balance, total = QUOTA_COLUMNS[kind]
+        changes = {balance.key: balance + amount}
+        if used:
+            changes[total.key] = total + used
+
+        await db.execute(
+            update(UserUsage)
+            .where(UserUsage.email == email)
+            .values(changes)
+            .execution_options(synchronize_session=False)
+        )
@@ -12,10 +12,98 @@ class Settings(BaseSettings):
 
     # PostgreSQL Database URL
     DATABASE_URL: str
+    # Server-side limit on any single statement, in milliseconds; 0 disables
+    DB_STATEMENT_TIMEOUT_MS: int = 30000
 
     # Generative AI Integrations
     GROQ_API_KEY: str
 
+    # LLM Dispatching (keep at or below the provider's rate limits)
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_REQUESTS_PER_MINUTE: int = 30
+    LLM_TOKENS_PER_MINUTE: int = 12000
+    LLM_MAX_RETRIES: int = 3
+    LLM_RETRY_BASE_DELAY: float = 0.5
+    LLM_RETRY_MAX_DELAY: float = 20.0
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30.0
+    # Seconds one completion attempt may take, streamed or not, before it is retried;
+    # 0 disables
+    LLM_COMPLETION_TIMEOUT: float = 90.0
+    # Concurrency slots are shared between teachers by weighted fair queuing (weight
+    # 1.0 unless listed by email); 0 leaves a single teacher uncapped
+    LLM_TENANT_WEIGHTS: dict[str, float] = {}
+    LLM_TENANT_MAX_CONCURRENCY: int = 0
+
+    # Hedging: when a completion is slower than this percentile of recent latencies,
+    # send a duplicate (optionally to another model) and keep whichever finishes first
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_MODEL: str | None = None
+
+    # Model routing: short answers to low-mark questions go to a fast, cheap model.
+    # Papers can override these rules with their own.
+    LLM_ROUTING_ENABLED: bool = False
+    LLM_FAST_MODEL: str = "llama-3.1-8b-instant"
+    LLM_FAST_MAX_MARKS: float = 2.0
+    LLM_FAST_MAX_ANSWER_TOKENS: int = 60
+
+    # LLM HTTP client (keep-alive pool shared by all Groq requests, timeouts in seconds)
+    LLM_HTTP_MAX_CONNECTIONS: int = 20
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP2: bool = False
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_REQUEST_TIMEOUT: float = 60.0
+    LLM_WARMUP_ON_STARTUP: bool = True
+
+    # Evaluation engine ("groq" or the offline "heuristic" engine). The fallback engine,
+    # if set, is used instead of refusing evaluation once the LLM token quota runs out.
+    EVALUATION_BACKEND: str = "groq"
+    EVALUATION_QUOTA_FALLBACK_BACKEND: str | None = None
+
+    # Grade all answers of a submission in a single completion
+    LLM_BATCH_EVALUATION: bool = False
+
+    # Pack single-answer evaluations from concurrent requests into batched completions
+    # (a window of 0 disables micro-batching)
+    LLM_MICRO_BATCH_WINDOW_MS: int = 0
+    LLM_MICRO_BATCH_MAX_SIZE: int = 10
+
+    # Answers longer than this (after compaction) are graded in parts, in tokens
+    LLM_ANSWER_TOKEN_BUDGET: int = 1500
+
+    # Answers to a question at least this similar are graded once per cluster when a
+    # whole paper is evaluated
+    EVALUATION_CLUSTER_THRESHOLD: float = 0.9
+
+    # Queued evaluation jobs run on workers inside the API process ("inline"), or only
+    # on `python -m app.worker` processes sharing the database ("external"). Either
+    # way EVALUATION_WORKERS jobs run at once per process.
+    EVALUATION_WORKER_MODE: str = "inline"
+    EVALUATION_WORKERS: int = 4
+    EVALUATION_WORKER_POLL_INTERVAL: float = 1.0
+    # A running job's lease is renewed by its worker; once it lapses (the worker died)
+    # any worker may claim the job again
+    EVALUATION_JOB_LEASE_SECONDS: int = 60
+    # Submissions graded at once by a job evaluating a whole paper
+    EVALUATION_BULK_CONCURRENCY: int = 4
+    # Seconds without progress before a progress stream re-checks the job and pings
+    EVALUATION_PROGRESS_KEEPALIVE: float = 15.0
+    # Graded answers are committed in batches of this size (or after this many
+    # seconds) while an evaluation runs, so a crash does not lose paid results; 0 disables
+    EVALUATION_CHECKPOINT_BATCH: int = 10
+    EVALUATION_CHECKPOINT_INTERVAL: float = 2.0
+    # Seconds budgeted for grading one submission. Answers still ungraded when it runs
+    # out are left pending for the next evaluation instead of holding up the rest;
+    # 0 disables
+    EVALUATION_DEADLINE_SECONDS: float = 300.0
+
+    # Evaluation result cache (in-process LRU backed by Postgres)
+    EVALUATION_CACHE_SIZE: int = 4096
+    EVALUATION_CACHE_PERSISTENT: bool = True
+
     # Environment (development, production)
     ENVIRONMENT: str
 
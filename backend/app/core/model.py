@@ -11,3 +11,34 @@ class EvaluationStatus(str, Enum):
     pending = "pending"
     success = "success"
     failed = "failed"
+
+
+class EvaluationSource(str, Enum):
+    llm = "llm"
+    rule = "rule"
+    heuristic = "heuristic"
+    inherited = "inherited"
+
+
+class EvaluationBackendName(str, Enum):
+    groq = "groq"
+    heuristic = "heuristic"
+
+
+class ReservationStatus(str, Enum):
+    reserved = "reserved"
+    settled = "settled"
+    released = "released"
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
+class QuotaKind(str, Enum):
+    papers = "papers"
+    submissions = "submissions"
+    llm_tokens = "llm_tokens"
@@ -1,4 +1,10 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import declarative_base
 
 from app.config import settings
@@ -13,6 +19,15 @@ engine = create_async_engine(
     pool_pre_ping=True,
     pool_size=5,
     max_overflow=10,
+    connect_args=(
+        {
+            "server_settings": {
+                "statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)
+            }
+        }
+        if settings.DB_STATEMENT_TIMEOUT_MS > 0
+        else {}
+    ),
 )
 
 AsyncSessionLocal = async_sessionmaker(
@@ -29,3 +44,25 @@ Base = declarative_base()
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+
+# create_all only creates missing tables, so columns added to tables that already
+# existed are upgraded here. Every statement is idempotent and runs on each startup.
+SCHEMA_UPGRADES = [
+    """
+    DO $$ BEGIN
+        CREATE TYPE evaluationsource AS ENUM ('llm', 'rule', 'heuristic', 'inherited');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    "ALTER TABLE question_papers ADD COLUMN IF NOT EXISTS routing_rules JSON",
+    "ALTER TABLE paper_questions ADD COLUMN IF NOT EXISTS auto_grade_exact_match BOOLEAN NOT NULL DEFAULT false",
+    "ALTER TABLE answers ADD COLUMN IF NOT EXISTS evaluation_source evaluationsource",
+    "ALTER TABLE answers ADD COLUMN IF NOT EXISTS graded_model VARCHAR",
+    "ALTER TABLE answers ADD COLUMN IF NOT EXISTS grading_fingerprint VARCHAR(64)",
+]
+
+
+async def upgrade_schema(conn: AsyncConnection) -> None:
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
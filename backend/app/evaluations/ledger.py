@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Row, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.auth.quota import Quota
+from app.core.model import QuotaKind, ReservationStatus
+from app.evaluations.model import TokenReservation
+
+
+class TokenLedger:
+    """
+    Reserves the estimated LLM cost of an evaluation against the teacher's monthly
+    balance before any call is dispatched, then settles it to the actual usage.
+    """
+
+    @staticmethod
+    async def reserve(
+        db: AsyncSession, email: str, tokens: int
+    ) -> TokenReservation | None:
+        """
+        Atomically take `tokens` from the balance and record the reservation.
+        Returns None when the balance cannot cover the estimate.
+        """
+        quota = await Quota.consume(
+            db, email, QuotaKind.llm_tokens, tokens, count_usage=False
+        )
+        if not quota.allowed:
+            return None
+
+        reservation = TokenReservation(email=email, reserved_tokens=tokens)
+        db.add(reservation)
+        # Commit right away so concurrent evaluations see the reduced balance.
+        await db.commit()
+        return reservation
+
+    @staticmethod
+    async def _close(
+        db: AsyncSession,
+        reservation_id: int,
+        status: ReservationStatus,
+        actual_tokens: int | None,
+    ) -> Row | None:
+        """
+        Move a reservation out of `reserved`, unless another process already did.
+        Returns its (email, reserved_tokens), or None if it was not open.
+        """
+        res = await db.execute(
+            update(TokenReservation)
+            .where(
+                TokenReservation.id == reservation_id,
+                TokenReservation.status == ReservationStatus.reserved,
+            )
+            .values(
+                status=status,
+                actual_tokens=actual_tokens,
+                settled_at=datetime.now(timezone.utc),
+            )
+            .returning(TokenReservation.email, TokenReservation.reserved_tokens)
+            .execution_options(synchronize_session=False)
+        )
+        return res.one_or_none()
+
+    @classmethod
+    async def settle(
+        cls, db: AsyncSession, reservation_id: int, actual_tokens: int
+    ) -> bool:
+        """
+        Refund the unused part of the reservation (or charge the overrun) and record
+        the actual usage, once: False if it was already settled or released. Joins
+        the caller's transaction; the caller commits.
+        """
+        reservation = await cls._close(
+            db, reservation_id, ReservationStatus.settled, actual_tokens
+        )
+        if reservation is None:
+            return False
+
+        await Quota.credit(
+            db,
+            reservation.email,
+            QuotaKind.llm_tokens,
+            reservation.reserved_tokens - actual_tokens,
+            used=actual_tokens,
+        )
+        return True
+
+    @classmethod
+    async def release(cls, db: AsyncSession, reservation_id: int) -> bool:
+        """Refund the whole reservation, once. Joins the caller's transaction."""
+        reservation = await cls._close(
+            db, reservation_id, ReservationStatus.released, None
+        )
+        if reservation is None:
+            return False
+
+        await Quota.credit(
+            db, reservation.email, QuotaKind.llm_tokens, reservation.reserved_tokens
+        )
+        return True
+
+    @classmethod
+    async def release_stale(cls, db: AsyncSession, older_than: timedelta) -> int:
+        """
+        Close reservations left open by a process that died mid-evaluation: settled to
+        the usage checkpointed before the crash, otherwise refunded in full. Safe to
+        run from several processes at once; each reservation is closed only once.
+        """
+        cutoff = datetime.now(timezone.utc) - older_than
+        res = await db.execute(
+            select(TokenReservation.id, TokenReservation.actual_tokens).where(
+                TokenReservation.status == ReservationStatus.reserved,
+                TokenReservation.created_at < cutoff,
+            )
+        )
+        closed = 0
+        for reservation_id, actual_tokens in res.all():
+            if actual_tokens is None:
+                closed += await cls.release(db, reservation_id)
+            else:
+                closed += await cls.settle(db, reservation_id, actual_tokens)
+            await db.commit()
+        return closed
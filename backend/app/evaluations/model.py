@@ -0,0 +1,88 @@
+from datetime import datetime
+from decimal import Decimal
+
+from typing import Optional
+
+from sqlalchemy import DateTime
+from sqlalchemy import Enum as SQLEnum
+from sqlalchemy import JSON, ForeignKey, Integer, Numeric, String, Text
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+
+from app.core.model import JobStatus, ReservationStatus
+from app.database import Base
+
+
+class EvaluationCacheEntry(Base):
+    __tablename__ = "evaluation_cache"
+
+    key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(String, nullable=False)
+    score: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    feedback: Mapped[str] = mapped_column(Text, nullable=False, default="")
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+
+class TokenReservation(Base):
+    __tablename__ = "token_reservations"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    email: Mapped[str] = mapped_column(
+        String, ForeignKey("app_users.email", ondelete="CASCADE"), index=True
+    )
+
+    reserved_tokens: Mapped[int] = mapped_column(Integer, nullable=False)
+    actual_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    status: Mapped[ReservationStatus] = mapped_column(
+        SQLEnum(ReservationStatus), default=ReservationStatus.reserved
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    settled_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+
+class EvaluationJob(Base):
+    __tablename__ = "evaluation_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    qpid: Mapped[int] = mapped_column(
+        Integer, ForeignKey("question_papers.qpid", ondelete="CASCADE"), index=True
+    )
+    # None for a job evaluating every pending submission of the paper
+    s_email: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    t_email: Mapped[str] = mapped_column(
+        String, ForeignKey("app_users.email", ondelete="CASCADE"), index=True
+    )
+    backend: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    status: Mapped[JobStatus] = mapped_column(
+        SQLEnum(JobStatus), default=JobStatus.queued, index=True
+    )
+    total_items: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    completed_items: Mapped[int] = mapped_column(Integer, default=0)
+    failed_items: Mapped[int] = mapped_column(Integer, default=0)
+    result: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    # Claim (worker and a unique token) holding the job until the lease expires
+    worker_id: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
+    finished_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime(timezone=True), nullable=True
+    )
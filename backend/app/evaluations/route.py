@@ -1,31 +1,184 @@
 from fastapi import APIRouter, Depends, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.dependencies import get_current_teacher
 from app.auth.schemas import Token
-from app.database import get_db
-from app.evaluations.service import SubEvaluationService
-from app.submissions.schemas import SubmissionDetailTeacherOut
+from app.core.model import EvaluationBackendName
+from app.database import engine, get_db
+from app.evaluations.schemas import (
+    EvaluationEstimateOut,
+    EvaluationJobOut,
+)
+from app.evaluations.service import (
+    EvaluationJobService,
+    SubEvaluationService,
+    job_workers,
+)
+from app.utils.cache import evaluation_cache
+from app.utils.evaluator import EvaluationService
 
 router = APIRouter(prefix="/api/evaluations", tags=["evaluations"])
 
 
+@router.post(
+    "/{qpid}",
+    response_model=EvaluationJobOut,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def evaluate_paper(
+    qpid: int,
+    backend: EvaluationBackendName | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_teacher: Token = Depends(get_current_teacher),
+):
+    """
+    Queue the evaluation of every submission of a question paper that is not yet
+    evaluated or has answers to regrade (the question or answer changed since grading).
+    Submissions are graded in parallel; the job reports `completed_items` and
+    `failed_items` out of `total_items` as it goes. Near-duplicate answers to a
+    question are graded once and the result is shared by the whole cluster.
+    Limited to the teacher who created the question paper.
+    """
+    job = await EvaluationJobService.enqueue_evaluation(
+        qpid, current_teacher, db, backend=backend
+    )
+    return EvaluationJobOut.model_validate(job)
+
+
 @router.post(
     "/{qpid}/{s_email}",
-    response_model=SubmissionDetailTeacherOut,
-    status_code=status.HTTP_200_OK,
+    response_model=EvaluationJobOut,
+    status_code=status.HTTP_202_ACCEPTED,
 )
 async def evaluate_submission(
     qpid: int,
     s_email: str,
+    backend: EvaluationBackendName | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_teacher: Token = Depends(get_current_teacher),
+):
+    """
+    Queue the evaluation of a specific student's submission for a question paper using
+    the AI Evaluator. Returns the job; poll `GET /api/evaluations/jobs/{job_id}` for its
+    status and the graded submission.
+    Pass `backend=heuristic` to grade fully offline without spending LLM tokens.
+    Limited to the teacher who created the question paper.
+    """
+    job = await EvaluationJobService.enqueue_evaluation(
+        qpid, current_teacher, db, backend=backend, s_email=s_email
+    )
+    return EvaluationJobOut.model_validate(job)
+
+
+@router.get("/jobs/{job_id}", response_model=EvaluationJobOut)
+async def get_evaluation_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_teacher: Token = Depends(get_current_teacher),
+):
+    """
+    Status of a queued evaluation, with the graded submission once it has succeeded.
+    Limited to the teacher who queued it.
+    """
+    job = await EvaluationJobService.get_job(job_id, current_teacher, db)
+    return EvaluationJobOut.model_validate(job)
+
+
+@router.get("/jobs/{job_id}/events", status_code=status.HTTP_200_OK)
+async def stream_evaluation_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_teacher: Token = Depends(get_current_teacher),
+):
+    """
+    Live progress of a queued evaluation as Server-Sent Events: answers done out of
+    total, failures, tokens spent and an ETA, then a final `done` event.
+    Limited to the teacher who queued it.
+    """
+    events = await EvaluationJobService.stream_progress(job_id, current_teacher, db)
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("/{qpid}/{s_email}/stream", status_code=status.HTTP_200_OK)
+async def evaluate_submission_stream(
+    qpid: int,
+    s_email: str,
+    backend: EvaluationBackendName | None = None,
     db: AsyncSession = Depends(get_db),
     current_teacher: Token = Depends(get_current_teacher),
 ):
     """
-    Evaluate a specific student's submission for a question paper using the AI Evaluator.
+    Evaluate a student's submission, streaming results as Server-Sent Events: `partial`
+    while an answer's feedback is being generated, `answer` once it is graded and a
+    final `done` event with the total marks.
     Limited to the teacher who created the question paper.
     """
-    submission = await SubEvaluationService.evaluate_submission(
-        qpid, s_email, current_teacher, db
+    events = await SubEvaluationService.evaluate_submission_stream(
+        qpid, s_email, current_teacher, db, backend=backend
+    )
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{qpid}/estimate", response_model=EvaluationEstimateOut)
+async def estimate_evaluation(
+    qpid: int,
+    s_email: str | None = None,
+    backend: EvaluationBackendName | None = None,
+    db: AsyncSession = Depends(get_db),
+    current_teacher: Token = Depends(get_current_teacher),
+):
+    """
+    Preview the estimated LLM token cost of evaluating a paper's submissions
+    (or a single student's submission when `s_email` is given).
+    Limited to the teacher who created the question paper.
+    """
+    estimate = await SubEvaluationService.estimate_paper(
+        qpid, current_teacher, db, s_email=s_email, backend=backend
+    )
+    return EvaluationEstimateOut(**estimate)
+
+
+@router.get("/cache/stats", status_code=status.HTTP_200_OK)
+async def get_cache_stats(
+    current_teacher: Token = Depends(get_current_teacher),
+) -> dict:
+    """
+    Hit/miss counters of the evaluation result cache for this process.
+    """
+    return evaluation_cache.stats()
+
+
+@router.get("/llm/stats", status_code=status.HTTP_200_OK)
+async def get_llm_stats(
+    current_teacher: Token = Depends(get_current_teacher),
+) -> dict:
+    """
+    Dispatcher, micro-batcher and HTTP connection pool usage of the LLM client, the
+    evaluation job workers and the database connection pool. Of the per-teacher
+    scheduler queues only the caller's own is shown.
+    """
+    stats = EvaluationService.stats()
+    scheduler = stats["dispatcher"]["scheduler"]
+    tenants = scheduler.pop("tenants")
+    scheduler["active_tenants"] = sum(
+        1 for t in tenants.values() if t["queued"] or t["running"]
     )
-    return SubmissionDetailTeacherOut.model_validate(submission)
+    scheduler["own"] = tenants.get(current_teacher.email)
+    return {
+        **stats,
+        "job_workers": job_workers.stats(),
+        "db_pool": {
+            "size": engine.pool.size(),
+            "checked_out": engine.pool.checkedout(),
+            "overflow": engine.pool.overflow(),
+        },
+    }
@@ -1,7 +1,39 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
+from app.core.model import JobStatus
+
 
 # Utilizing the schemas from app.submissions.schemas for response.
 # Additional evaluation specific schemas can be added here if needed.
 class EvaluationMessageOut(BaseModel):
     message: str
+
+
+class EvaluationEstimateOut(BaseModel):
+    qpid: int
+    backend: str
+    submissions: int
+    answers: int
+    llm_answers: int
+    estimated_tokens: int
+    llm_tokens_balance: int | None = None
+
+
+class EvaluationJobOut(BaseModel):
+    id: int
+    qpid: int
+    s_email: str | None = None
+    backend: str | None = None
+    status: JobStatus
+    total_items: int | None = None
+    completed_items: int = 0
+    failed_items: int = 0
+    result: dict | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+    model_config = {"from_attributes": True}
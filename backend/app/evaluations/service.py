@@ -1,43 +1,168 @@
 import asyncio
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from typing import AsyncIterator, Callable
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from pydantic import BaseModel
+from sqlalchemy import (
+    Boolean,
+    Integer,
+    Numeric,
+    String,
+    Text,
+    cast,
+    column,
+    func,
+    or_,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.auth.model import UserUsage
 from app.auth.schemas import Token
-from app.core.model import EvaluationStatus, UserType
+from app.config import settings
+from app.core.model import (
+    EvaluationBackendName,
+    EvaluationSource,
+    EvaluationStatus,
+    JobStatus,
+    UserType,
+)
+from app.database import AsyncSessionLocal
+from app.evaluations.ledger import TokenLedger
+from app.evaluations.model import EvaluationJob, TokenReservation
+from app.evaluations.schemas import EvaluationJobOut
 from app.papers.model import Question, QuestionPaper
 from app.submissions.model import Answer, Submission
+from app.submissions.schemas import AnswerTeacherOut, SubmissionDetailTeacherOut
+from app.utils.evaluator import (
+    DeadlineExceededError,
+    EvaluationBackend,
+    EvaluationItem,
+    EvaluationResponse,
+    PartialEvaluation,
+)
 from app.utils.evaluator import EvaluationService as LLMEvaluationService
+from app.utils.clustering import AnswerClusterer
+from app.utils.logging import logger
+from app.utils.pregrader import PreGrader
+from app.utils.progress import JobProgress, progress_broker
+from app.utils.routing import ModelRouter, RoutingRules
+from app.utils.scheduling import tenant_scope
+from app.utils.workers import WorkerPool
 
+# Prefix of this process's job claims (each claim adds a unique suffix)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
 
-class SubEvaluationService:
-    @staticmethod
-    async def evaluate_submission(
-        qpid: int,
-        s_email: str,
-        current_teacher: Token,
-        db: AsyncSession,
-    ) -> Submission:
-        if current_teacher.role != UserType.teacher.value:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Only teachers can trigger evaluation.",
-            )
+clusterer = AnswerClusterer(threshold=settings.EVALUATION_CLUSTER_THRESHOLD)
 
-        usage_res = await db.execute(
-            select(UserUsage).where(UserUsage.email == current_teacher.email)
-        )
-        teacher_usage = usage_res.scalar_one_or_none()
 
-        if teacher_usage and teacher_usage.llm_tokens_balance_monthly <= 0:
-            raise HTTPException(
-                status_code=status.HTTP_402_PAYMENT_REQUIRED,
-                detail="Monthly LLM token limit reached.",
-            )
+def sse_event(event: str, data: BaseModel | dict) -> str:
+    payload = (
+        data.model_dump_json() if isinstance(data, BaseModel) else json.dumps(data)
+    )
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def to_item(ans: Answer, q: Question) -> EvaluationItem:
+    return EvaluationItem(
+        qid=ans.qid,
+        question=q.question_text,
+        student_answer=ans.student_answer or "",
+        max_marks=float(q.marks_assigned),
+        teacher_answer=q.model_answer,
+        rubric=q.rubric,
+    )
+
+
+def grading_fingerprint(ans: Answer, q: Question) -> str:
+    """Hash of the question and answer inputs an answer was graded with."""
+    payload = json.dumps(
+        [
+            q.question_text,
+            q.model_answer,
+            q.rubric,
+            str(q.marks_assigned),
+            ans.student_answer,
+        ]
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def needs_grading(ans: Answer, q: Question) -> bool:
+    # Answers graded before fingerprints were recorded have none; they are kept.
+    return ans.status != EvaluationStatus.success or (
+        ans.grading_fingerprint is not None
+        and ans.grading_fingerprint != grading_fingerprint(ans, q)
+    )
+
+
+@dataclass
+class EvaluationRun:
+    """State of one submission's evaluation, shared by its grading phases."""
 
+    submissions: list[Submission]
+    answers: list[Answer]
+    questions_map: dict[int, Question]
+    engine: EvaluationBackend
+    reservation: TokenReservation | None = None
+    rule_results: list[tuple[Answer, EvaluationResponse]] = field(default_factory=list)
+    llm_answers: list[Answer] = field(default_factory=list)
+    # Every answer graded in this run (the others keep their previous grade)
+    graded: list[Answer] = field(default_factory=list)
+    routing_rules: RoutingRules | None = None
+    progress: JobProgress | None = None
+    # Teacher the LLM calls are scheduled for
+    tenant: str | None = None
+    # Monotonic time by which grading must stop, if budgeted
+    deadline: float | None = None
+    # (s_email, qid) of answers graded so far, and those left for a later evaluation
+    completed: set[tuple[str, int]] = field(default_factory=set)
+    deferred: list[Answer] = field(default_factory=list)
+    tokens_used: int = 0
+    # Graded answers not yet checkpointed, and when the last checkpoint was written
+    unsaved: list[Answer] = field(default_factory=list)
+    checkpointed_at: float = field(default_factory=time.monotonic)
+    checkpoint_lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+    def add_tokens(self, tokens: int) -> None:
+        self.tokens_used += tokens
+        if self.progress:
+            self.progress.add_tokens(tokens)
+
+    def time_left(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def answer_done(self, ans: Answer) -> None:
+        self.completed.add((ans.s_email, ans.qid))
+        if ans.status == EvaluationStatus.success:
+            self.unsaved.append(ans)
+        if self.progress:
+            self.progress.answer_done(ans.status == EvaluationStatus.failed)
+
+    def to_item(self, ans: Answer) -> EvaluationItem:
+        item = to_item(ans, self.questions_map[ans.qid])
+        item.model = ModelRouter.route(item, self.routing_rules)
+        return item
+
+
+class SubEvaluationService:
+    @staticmethod
+    async def _get_own_paper(
+        qpid: int, current_teacher: Token, db: AsyncSession
+    ) -> QuestionPaper:
         paper_res = await db.execute(
             select(QuestionPaper).where(QuestionPaper.qpid == qpid)
         )
@@ -52,77 +177,1263 @@ class SubEvaluationService:
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="You can only evaluate submissions for your own papers.",
             )
+        return paper
+
+    @staticmethod
+    async def _load_questions(qpid: int, db: AsyncSession) -> dict[int, Question]:
+        q_res = await db.execute(select(Question).where(Question.qpid == qpid))
+        return {q.qid: q for q in q_res.scalars().all()}
+
+    @staticmethod
+    def _pre_grade(ans: Answer, q: Question) -> EvaluationResponse | None:
+        return PreGrader.grade(
+            to_item(ans, q),
+            exact_match=bool(q.auto_grade_exact_match),
+        )
+
+    @staticmethod
+    def _apply_result(
+        ans: Answer,
+        eval_res: EvaluationResponse,
+        source: EvaluationSource,
+        model: str | None = None,
+    ) -> None:
+        awarded = Decimal(str(eval_res.score))
+
+        ans.marks_obtained = round(awarded, 2)
+        ans.feedback = eval_res.feedback
+        ans.status = EvaluationStatus.success
+        ans.evaluation_source = source
+        ans.graded_model = model
+
+    @staticmethod
+    def _cluster(
+        answers: list[Answer],
+    ) -> tuple[list[Answer], list[tuple[Answer, list[Answer]]]]:
+        """Split answers into cluster representatives and their near-duplicates."""
+        by_question: dict[int, list[Answer]] = {}
+        for a in answers:
+            by_question.setdefault(a.qid, []).append(a)
+
+        representatives: list[Answer] = []
+        clusters: list[tuple[Answer, list[Answer]]] = []
+        for group in by_question.values():
+            for indices in clusterer.cluster([a.student_answer or "" for a in group]):
+                representative, *members = [group[i] for i in indices]
+                representatives.append(representative)
+                if members:
+                    clusters.append((representative, members))
+        return representatives, clusters
+
+    @staticmethod
+    async def _start_evaluation(
+        qpid: int,
+        s_email: str,
+        current_teacher: Token,
+        db: AsyncSession,
+        backend: EvaluationBackendName | None = None,
+        paper: QuestionPaper | None = None,
+        questions_map: dict[int, Question] | None = None,
+        progress: JobProgress | None = None,
+        inherited: set[int] | None = None,
+    ) -> EvaluationRun:
+        """
+        Checks, loads and pre-grades one student's submission and reserves the
+        estimated LLM cost. Answers to the `inherited` questions are left to the bulk
+        job, which grades them from a near-duplicate in another submission. A paper
+        and questions already loaded (and checked) by the caller are reused.
+        """
+        if current_teacher.role != UserType.teacher.value:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only teachers can trigger evaluation.",
+            )
+
+        deadline = (
+            time.monotonic() + settings.EVALUATION_DEADLINE_SECONDS
+            if settings.EVALUATION_DEADLINE_SECONDS > 0
+            else None
+        )
+        engine = LLMEvaluationService.get_backend(backend.value if backend else None)
+
+        if paper is None:
+            paper = await SubEvaluationService._get_own_paper(qpid, current_teacher, db)
 
         sub_res = await db.execute(
             select(Submission).where(
                 Submission.qpid == qpid, Submission.s_email == s_email
             )
         )
-        submission = sub_res.scalar_one_or_none()
-        if submission is None:
+        submissions = list(sub_res.scalars().all())
+        if not submissions:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found"
             )
 
-        q_res = await db.execute(select(Question).where(Question.qpid == qpid))
-        questions_map = {q.qid: q for q in q_res.scalars().all()}
+        if questions_map is None:
+            questions_map = await SubEvaluationService._load_questions(qpid, db)
 
+        # Only answers that are ungraded, failed or graded from different inputs
+        # (an edited question, rubric or answer) are graded again.
         a_res = await db.execute(
             select(Answer).where(Answer.qpid == qpid, Answer.s_email == s_email)
         )
         answers = list(a_res.scalars().all())
+        stale = [
+            a
+            for a in answers
+            if a.qid in questions_map
+            and a.qid not in (inherited or ())
+            and needs_grading(a, questions_map[a.qid])
+        ]
 
-        total_marks = Decimal("0.0")
-        total_tokens_used = 0
+        run = EvaluationRun(
+            submissions=submissions,
+            answers=answers,
+            questions_map=questions_map,
+            engine=engine,
+            routing_rules=(
+                RoutingRules.model_validate(paper.routing_rules)
+                if paper.routing_rules
+                else None
+            ),
+            progress=progress,
+            graded=stale,
+            tenant=current_teacher.email,
+            deadline=deadline,
+        )
+        if progress is not None:
+            progress.submission_started(len(stale))
 
-        async def eval_answer(ans: Answer) -> Answer:
-            nonlocal total_tokens_used
-            q = questions_map.get(ans.qid)
-            if not q:
-                return ans
+        # Settle blank and exact-match answers locally; they never reach the LLM.
+        for a in stale:
+            rule_res = SubEvaluationService._pre_grade(a, questions_map[a.qid])
+            if rule_res is not None:
+                run.rule_results.append((a, rule_res))
+            else:
+                run.llm_answers.append(a)
 
-            try:
-                eval_res, tokens = await LLMEvaluationService.evaluate(
-                    question=q.question_text,
-                    student_answer=ans.student_answer or "",
-                    max_marks=float(q.marks_assigned),
-                    teacher_answer=q.model_answer,
-                    rubric=q.rubric,
+        # Reserve the estimated cost up front so concurrent evaluations cannot
+        # overspend; this is also the balance check, done by the database.
+        estimated_tokens = LLMEvaluationService.estimate(
+            [run.to_item(a) for a in run.llm_answers], backend=engine.name
+        )
+        if estimated_tokens > 0:
+            run.reservation = await TokenLedger.reserve(
+                db, current_teacher.email, estimated_tokens
+            )
+            if run.reservation is None:
+                if not settings.EVALUATION_QUOTA_FALLBACK_BACKEND:
+                    raise HTTPException(
+                        status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                        detail=f"Evaluation needs about {estimated_tokens} tokens, more than the remaining monthly LLM token balance.",
+                    )
+                run.engine = LLMEvaluationService.get_backend(
+                    settings.EVALUATION_QUOTA_FALLBACK_BACKEND
                 )
 
-                total_tokens_used += tokens
-                awarded = Decimal(str(eval_res.score))
+        # End the read transaction so no pooled connection is held during the LLM
+        # calls; loaded objects stay usable since sessions do not expire on commit.
+        await db.commit()
+        return run
 
-                ans.marks_obtained = round(awarded, 2)
-                ans.feedback = eval_res.feedback
-                ans.status = EvaluationStatus.success
-            except Exception as _:
-                ans.status = EvaluationStatus.failed
+    @staticmethod
+    async def _grade_answer(
+        run: EvaluationRun,
+        ans: Answer,
+        on_partial: Callable[[PartialEvaluation], None] | None = None,
+    ) -> None:
+        item = run.to_item(ans)
+        try:
+            with tenant_scope(run.tenant, run.deadline, run.add_tokens):
+                if on_partial is not None:
+                    eval_res, tokens = await LLMEvaluationService.evaluate_streaming(
+                        item, on_partial, backend=run.engine.name
+                    )
+                else:
+                    eval_res, tokens = await LLMEvaluationService.evaluate(
+                        question=item.question,
+                        student_answer=item.student_answer,
+                        max_marks=item.max_marks,
+                        teacher_answer=item.teacher_answer,
+                        rubric=item.rubric,
+                        backend=run.engine.name,
+                        model=item.model,
+                    )
 
-            return ans
+            run.add_tokens(tokens)
+            SubEvaluationService._apply_result(
+                ans,
+                eval_res,
+                run.engine.source,
+                eval_res.model or run.engine.model_for(item),
+            )
+        except DeadlineExceededError:
+            # Left pending for the next evaluation
+            return
+        except Exception as _:
+            ans.status = EvaluationStatus.failed
+        run.answer_done(ans)
+        await SubEvaluationService._checkpoint(run)
 
-        tasks = [eval_answer(a) for a in answers]
-        await asyncio.gather(*tasks)
+    @staticmethod
+    async def _grade_batch(run: EvaluationRun, batch: list[Answer]) -> None:
+        items = [run.to_item(a) for a in batch]
 
-        for a in answers:
+        try:
+            with tenant_scope(run.tenant, run.deadline, run.add_tokens):
+                results, tokens = await LLMEvaluationService.evaluate_batch(
+                    items, backend=run.engine.name
+                )
+            run.add_tokens(tokens)
+        except DeadlineExceededError:
+            return
+        except Exception as _:
+            results = {}
+
+        for a, item in zip(batch, items):
+            if a.qid in results:
+                SubEvaluationService._apply_result(
+                    a,
+                    results[a.qid],
+                    run.engine.source,
+                    results[a.qid].model or run.engine.model_for(item),
+                )
+            else:
+                a.status = EvaluationStatus.failed
+            run.answer_done(a)
+        await SubEvaluationService._checkpoint(run)
+
+    @staticmethod
+    async def _grade_all(run: EvaluationRun) -> None:
+        for a, rule_res in run.rule_results:
+            SubEvaluationService._apply_result(a, rule_res, EvaluationSource.rule)
+            run.answer_done(a)
+
+        if settings.LLM_BATCH_EVALUATION or not run.engine.remote:
+            # One batched completion per submission.
+            batches: dict[str, list[Answer]] = {}
+            for a in run.llm_answers:
+                batches.setdefault(a.s_email, []).append(a)
+            calls = [
+                SubEvaluationService._grade_batch(run, batch)
+                for batch in batches.values()
+            ]
+        else:
+            # Every call is throttled by the shared LLM dispatcher, so fanning out here
+            # cannot exceed the provider's concurrency or rate limits.
+            calls = [
+                SubEvaluationService._grade_answer(run, a) for a in run.llm_answers
+            ]
+        await SubEvaluationService._run_until_deadline(run, calls)
+
+    @staticmethod
+    async def _run_until_deadline(run: EvaluationRun, calls: list) -> None:
+        tasks = [asyncio.ensure_future(call) for call in calls]
+        if not tasks:
+            return
+
+        # Calls cut off by the deadline themselves end without grading their answers.
+        try:
+            _, unfinished = await asyncio.wait(tasks, timeout=run.time_left())
+        except BaseException:
+            # Cancelled calls charge their estimate before the run is settled.
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        SubEvaluationService._defer_unfinished(run)
+
+    @staticmethod
+    def _defer_unfinished(run: EvaluationRun) -> None:
+        """
+        Leave the answers not graded within the budget pending; they count as stale,
+        so the next evaluation of the submission grades them.
+        """
+        deferred = [
+            a for a in run.llm_answers if (a.s_email, a.qid) not in run.completed
+        ]
+        for a in deferred:
+            a.status = EvaluationStatus.pending
+        run.deferred.extend(deferred)
+        if not deferred:
+            return
+        if run.progress:
+            run.progress.answers_deferred(len(deferred))
+        logger.warning(
+            "Evaluation deadline exceeded",
+            tenant=run.tenant,
+            deferred=len(deferred),
+        )
+
+    @staticmethod
+    def _answers_update(answers: list[Answer], questions_map: dict[int, Question]):
+        """One UPDATE ... FROM (VALUES ...) writing the grades of `answers`."""
+        rows = values(
+            column("qpid", Integer),
+            column("s_email", String),
+            column("qid", Integer),
+            column("marks_obtained", Numeric(10, 2)),
+            column("feedback", Text),
+            column("status", String),
+            column("evaluation_source", String),
+            column("graded_model", String),
+            column("grading_fingerprint", String),
+            name="results",
+        ).data(
+            [
+                (
+                    a.qpid,
+                    a.s_email,
+                    a.qid,
+                    a.marks_obtained,
+                    a.feedback,
+                    a.status.value,
+                    a.evaluation_source.value if a.evaluation_source else None,
+                    a.graded_model,
+                    (
+                        grading_fingerprint(a, questions_map[a.qid])
+                        if a.status == EvaluationStatus.success
+                        and a.qid in questions_map
+                        else a.grading_fingerprint
+                    ),
+                )
+                for a in answers
+            ]
+        )
+
+        return (
+            update(Answer)
+            .where(
+                Answer.qpid == rows.c.qpid,
+                Answer.s_email == rows.c.s_email,
+                Answer.qid == rows.c.qid,
+            )
+            .values(
+                marks_obtained=rows.c.marks_obtained,
+                feedback=rows.c.feedback,
+                status=cast(rows.c.status, Answer.status.type),
+                evaluation_source=cast(
+                    rows.c.evaluation_source, Answer.evaluation_source.type
+                ),
+                graded_model=rows.c.graded_model,
+                grading_fingerprint=rows.c.grading_fingerprint,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    async def _save_answers(run: EvaluationRun, db: AsyncSession) -> None:
+        """
+        Write every graded answer in one statement. The returned rows replace the
+        in-memory objects' state, unflushed changes included, so the session never
+        issues per-row UPDATEs or needs a refresh afterwards.
+        """
+        if not run.graded:
+            return
+
+        await db.execute(
+            SubEvaluationService._answers_update(run.graded, run.questions_map)
+            .returning(Answer)
+            .execution_options(populate_existing=True)
+        )
+
+    @staticmethod
+    async def _checkpoint(run: EvaluationRun) -> None:
+        """
+        Commit the answers graded since the last checkpoint, with the tokens spent so
+        far, on a short-lived session of its own. A restarted evaluation then only
+        grades what is still pending or failed.
+        """
+        batch_size = settings.EVALUATION_CHECKPOINT_BATCH
+        if batch_size <= 0 or not run.unsaved:
+            return
+        if (
+            len(run.unsaved) < batch_size
+            and time.monotonic() - run.checkpointed_at
+            < settings.EVALUATION_CHECKPOINT_INTERVAL
+        ):
+            return
+
+        async with run.checkpoint_lock:
+            answers, run.unsaved = run.unsaved, []
+            if not answers:
+                return
+            run.checkpointed_at = time.monotonic()
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        SubEvaluationService._answers_update(answers, run.questions_map)
+                    )
+                    if run.reservation:
+                        await db.execute(
+                            update(TokenReservation)
+                            .where(TokenReservation.id == run.reservation.id)
+                            .values(actual_tokens=run.tokens_used)
+                            .execution_options(synchronize_session=False)
+                        )
+                    await db.commit()
+            except Exception as exc:
+                # The final save still writes them; a checkpoint is only insurance.
+                logger.warning("Evaluation checkpoint failed", error=str(exc))
+
+    @staticmethod
+    async def _save_submissions(run: EvaluationRun, db: AsyncSession) -> None:
+        if not run.submissions:
+            return
+
+        totals = {sub.s_email: Decimal("0.0") for sub in run.submissions}
+        for a in run.answers:
             if a.status == EvaluationStatus.success:
-                total_marks += a.marks_obtained
-            db.add(a)
+                totals[a.s_email] += a.marks_obtained
+        deferred_students = {a.s_email for a in run.deferred}
+
+        rows = values(
+            column("s_email", String),
+            column("total_marks_obtained", Numeric(10, 2)),
+            column("evaluated", Boolean),
+            name="totals",
+        ).data(
+            [
+                (s_email, total, s_email not in deferred_students)
+                for s_email, total in totals.items()
+            ]
+        )
 
-        submission.evaluated = True
-        submission.total_marks_obtained = total_marks
-        db.add(submission)
+        await db.execute(
+            update(Submission)
+            .where(
+                Submission.qpid == run.submissions[0].qpid,
+                Submission.s_email == rows.c.s_email,
+            )
+            .values(
+                evaluated=rows.c.evaluated,
+                total_marks_obtained=rows.c.total_marks_obtained,
+            )
+            .returning(Submission)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
 
-        if teacher_usage:
-            teacher_usage.llm_tokens_balance_monthly -= total_tokens_used
-            teacher_usage.total_llm_tokens_used += total_tokens_used
-            db.add(teacher_usage)
+    @staticmethod
+    async def _finish_evaluation(run: EvaluationRun, db: AsyncSession) -> None:
+        await SubEvaluationService._save_answers(run, db)
+        await SubEvaluationService._save_submissions(run, db)
+
+        if run.reservation:
+            await TokenLedger.settle(db, run.reservation.id, run.tokens_used)
 
         await db.commit()
-        await db.refresh(submission)
 
-        for a in answers:
-            await db.refresh(a)
+    @staticmethod
+    async def _abort_evaluation(run: EvaluationRun, db: AsyncSession) -> None:
+        """
+        Discard unsaved results but still bill the tokens already spent. Settles on a
+        session of its own, since `db` may have been interrupted mid-statement.
+        """
+        # Read before the rollback, which expires the reservation's attributes.
+        reservation_id = run.reservation.id if run.reservation else None
+        try:
+            await db.rollback()
+        except Exception as exc:
+            logger.warning("Rollback of aborted evaluation failed", error=str(exc))
+
+        if reservation_id is not None:
+            async with AsyncSessionLocal() as session:
+                await TokenLedger.settle(session, reservation_id, run.tokens_used)
+                await session.commit()
 
-        submission.answers = answers
+    @staticmethod
+    async def _inherit_grades(
+        qpid: int,
+        clusters: list[tuple[Answer, list[Answer]]],
+        questions_map: dict[int, Question],
+        db: AsyncSession,
+        progress: JobProgress | None = None,
+    ) -> list[Submission]:
+        """
+        Give each cluster member the grade its representative got in its own
+        submission's evaluation, then update the members' submission totals. A
+        representative left pending (deferred, or its submission failed) leaves its
+        members pending too, so the next evaluation grades them.
+        """
+        if not clusters:
+            return []
+
+        # The representatives were graded on other sessions; reload their grades.
+        a_res = await db.execute(
+            select(Answer)
+            .where(Answer.qpid == qpid)
+            .execution_options(populate_existing=True)
+        )
+        students = {a.s_email for _, members in clusters for a in members}
+        sub_res = await db.execute(
+            select(Submission)
+            .where(Submission.qpid == qpid, Submission.s_email.in_(students))
+            .execution_options(populate_existing=True)
+        )
+        run = EvaluationRun(
+            submissions=list(sub_res.scalars().all()),
+            answers=[a for a in a_res.scalars().all() if a.s_email in students],
+            questions_map=questions_map,
+            engine=LLMEvaluationService.get_backend(None),
+            progress=progress,
+        )
+        if progress is not None:
+            progress.total_answers += sum(len(members) for _, members in clusters)
+
+        for representative, members in clusters:
+            current = not needs_grading(
+                representative, questions_map[representative.qid]
+            )
+            for a in members:
+                run.graded.append(a)
+                if representative.status == EvaluationStatus.success and current:
+                    a.marks_obtained = representative.marks_obtained
+                    a.feedback = representative.feedback
+                    a.status = EvaluationStatus.success
+                    a.evaluation_source = EvaluationSource.inherited
+                    a.graded_model = representative.graded_model
+                elif representative.status == EvaluationStatus.failed:
+                    a.status = EvaluationStatus.failed
+                else:
+                    a.status = EvaluationStatus.pending
+                    run.deferred.append(a)
+                    continue
+                run.answer_done(a)
+
+        # A student's own evaluation may have left answers ungraded (deferred at the
+        # deadline, refused or crashed); their submission then stays unevaluated.
+        inherited = {(a.s_email, a.qid) for a in run.graded}
+        for a in run.answers:
+            if (a.s_email, a.qid) in inherited or a.qid not in questions_map:
+                continue
+            if a.status == EvaluationStatus.pending or (
+                a.status == EvaluationStatus.success
+                and needs_grading(a, questions_map[a.qid])
+            ):
+                run.deferred.append(a)
+
+        await SubEvaluationService._finish_evaluation(run, db)
+        return run.submissions
+
+    @staticmethod
+    async def evaluate_submission(
+        qpid: int,
+        s_email: str,
+        current_teacher: Token,
+        db: AsyncSession,
+        backend: EvaluationBackendName | None = None,
+        paper: QuestionPaper | None = None,
+        questions_map: dict[int, Question] | None = None,
+        progress: JobProgress | None = None,
+        inherited: set[int] | None = None,
+    ) -> Submission:
+        run = await SubEvaluationService._start_evaluation(
+            qpid,
+            s_email,
+            current_teacher,
+            db,
+            backend,
+            paper=paper,
+            questions_map=questions_map,
+            progress=progress,
+            inherited=inherited,
+        )
+
+        try:
+            await SubEvaluationService._grade_all(run)
+            await SubEvaluationService._finish_evaluation(run, db)
+        except BaseException:
+            # Cancellation too (shutdown, a lost lease): the reservation must settle.
+            await SubEvaluationService._abort_evaluation(run, db)
+            raise
+
+        submission = run.submissions[0]
+        submission.answers = run.answers
         return submission
+
+    @staticmethod
+    async def evaluate_submission_stream(
+        qpid: int,
+        s_email: str,
+        current_teacher: Token,
+        db: AsyncSession,
+        backend: EvaluationBackendName | None = None,
+    ) -> AsyncIterator[str]:
+        """
+        Validate and reserve up front (so errors still map to HTTP status codes), then
+        return a generator of Server-Sent Events: `partial` while a completion streams
+        in, `answer` as each answer is graded and a final `done` with the total.
+        """
+        run = await SubEvaluationService._start_evaluation(
+            qpid, s_email, current_teacher, db, backend
+        )
+        return SubEvaluationService._stream_events(run, db)
+
+    @staticmethod
+    async def _stream_events(
+        run: EvaluationRun, db: AsyncSession
+    ) -> AsyncIterator[str]:
+        queue: asyncio.Queue[tuple[str, Answer, PartialEvaluation | None]] = (
+            asyncio.Queue()
+        )
+
+        async def grade(ans: Answer) -> None:
+            await SubEvaluationService._grade_answer(
+                run,
+                ans,
+                on_partial=lambda partial: queue.put_nowait(("partial", ans, partial)),
+            )
+            queue.put_nowait(("answer", ans, None))
+
+        tasks: list[asyncio.Task] = []
+        finished = False
+        try:
+            for a, rule_res in run.rule_results:
+                SubEvaluationService._apply_result(a, rule_res, EvaluationSource.rule)
+                yield sse_event("answer", AnswerTeacherOut.model_validate(a))
+
+            tasks = [asyncio.create_task(grade(a)) for a in run.llm_answers]
+            remaining = len(tasks)
+            while remaining:
+                try:
+                    kind, ans, partial = await asyncio.wait_for(
+                        queue.get(), timeout=run.time_left()
+                    )
+                except asyncio.TimeoutError:
+                    break
+                if kind == "partial" and partial is not None:
+                    yield sse_event(
+                        "partial",
+                        {
+                            "qid": ans.qid,
+                            "score": partial.score,
+                            "feedback": partial.feedback,
+                        },
+                    )
+                else:
+                    remaining -= 1
+                    if (ans.s_email, ans.qid) in run.completed:
+                        yield sse_event("answer", AnswerTeacherOut.model_validate(ans))
+
+            if remaining:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                # Answers finished just before the deadline
+                while not queue.empty():
+                    kind, ans, _ = queue.get_nowait()
+                    if kind == "answer" and (ans.s_email, ans.qid) in run.completed:
+                        yield sse_event("answer", AnswerTeacherOut.model_validate(ans))
+            # Then those left pending, cut off mid-call or never started
+            SubEvaluationService._defer_unfinished(run)
+            for ans in run.deferred:
+                yield sse_event("answer", AnswerTeacherOut.model_validate(ans))
+
+            await SubEvaluationService._finish_evaluation(run, db)
+            submission = run.submissions[0]
+            finished = True
+            yield sse_event(
+                "done",
+                {
+                    "qpid": submission.qpid,
+                    "s_email": submission.s_email,
+                    "evaluated": submission.evaluated,
+                    "total_marks_obtained": str(submission.total_marks_obtained),
+                    "tokens_used": run.tokens_used,
+                    "deferred": len(run.deferred),
+                },
+            )
+        finally:
+            # The client may disconnect mid-stream.
+            if not finished:
+                for task in tasks:
+                    task.cancel()
+                # Let cancelled calls charge their estimate before settling.
+                await asyncio.gather(*tasks, return_exceptions=True)
+                await SubEvaluationService._abort_evaluation(run, db)
+
+    @staticmethod
+    async def estimate_paper(
+        qpid: int,
+        current_teacher: Token,
+        db: AsyncSession,
+        s_email: str | None = None,
+        backend: EvaluationBackendName | None = None,
+    ) -> dict:
+        """
+        Estimated token cost of evaluating every submission of a paper (or a single
+        student's), computed locally without calling the LLM.
+        """
+        await SubEvaluationService._get_own_paper(qpid, current_teacher, db)
+        engine = LLMEvaluationService.get_backend(backend.value if backend else None)
+
+        q_res = await db.execute(select(Question).where(Question.qpid == qpid))
+        questions_map = {q.qid: q for q in q_res.scalars().all()}
+
+        a_stmt = select(Answer).where(Answer.qpid == qpid)
+        if s_email is not None:
+            a_stmt = a_stmt.where(Answer.s_email == s_email)
+        a_res = await db.execute(a_stmt)
+
+        items_by_student: dict[str, list[EvaluationItem]] = {}
+        answer_count = 0
+        for a in a_res.scalars().all():
+            q = questions_map.get(a.qid)
+            if q is None:
+                continue
+            answer_count += 1
+            items = items_by_student.setdefault(a.s_email, [])
+            if needs_grading(a, q) and SubEvaluationService._pre_grade(a, q) is None:
+                items.append(to_item(a, q))
+
+        usage_res = await db.execute(
+            select(UserUsage).where(UserUsage.email == current_teacher.email)
+        )
+        teacher_usage = usage_res.scalar_one_or_none()
+
+        return {
+            "qpid": qpid,
+            "backend": engine.name,
+            "submissions": len(items_by_student),
+            "answers": answer_count,
+            "llm_answers": sum(len(items) for items in items_by_student.values()),
+            "estimated_tokens": sum(
+                LLMEvaluationService.estimate(items, backend=engine.name)
+                for items in items_by_student.values()
+            ),
+            "llm_tokens_balance": (
+                teacher_usage.llm_tokens_balance_monthly if teacher_usage else None
+            ),
+        }
+
+
+@dataclass
+class ClaimedJob:
+    id: int
+    qpid: int
+    s_email: str | None
+    t_email: str
+    backend: str | None
+    # Kept in the job's worker_id while this claim holds it
+    claim: str
+
+
+class EvaluationJobService:
+    """
+    Evaluations run as persisted jobs, so the request that queues one returns
+    immediately instead of waiting on the LLM. The jobs table is the queue: workers in
+    the API process or in separate `app.worker` processes claim jobs under a lease.
+    """
+
+    @staticmethod
+    async def enqueue_evaluation(
+        qpid: int,
+        current_teacher: Token,
+        db: AsyncSession,
+        backend: EvaluationBackendName | None = None,
+        s_email: str | None = None,
+    ) -> EvaluationJob:
+        """
+        Queue one student's submission, or every pending one when `s_email` is None.
+        Returns the job already queued or running for the same target, if any.
+        """
+        if current_teacher.role != UserType.teacher.value:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Only teachers can trigger evaluation.",
+            )
+
+        await SubEvaluationService._get_own_paper(qpid, current_teacher, db)
+
+        if s_email is not None:
+            sub_res = await db.execute(
+                select(Submission.s_email).where(
+                    Submission.qpid == qpid, Submission.s_email == s_email
+                )
+            )
+            if sub_res.scalar_one_or_none() is None:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Submission not found",
+                )
+
+        # Serialize enqueues per paper so two requests cannot both miss the other's job.
+        await db.execute(
+            select(QuestionPaper.qpid)
+            .where(QuestionPaper.qpid == qpid)
+            .with_for_update()
+        )
+        existing_res = await db.execute(
+            select(EvaluationJob)
+            .where(
+                EvaluationJob.qpid == qpid,
+                EvaluationJob.s_email.is_not_distinct_from(s_email),
+                EvaluationJob.status.in_([JobStatus.queued, JobStatus.running]),
+            )
+            .order_by(EvaluationJob.id)
+            .limit(1)
+        )
+        existing = existing_res.scalar_one_or_none()
+        if existing is not None:
+            # Grading the same answers twice would only race on the results.
+            await db.commit()
+            return existing
+
+        job = EvaluationJob(
+            qpid=qpid,
+            s_email=s_email,
+            t_email=current_teacher.email,
+            backend=backend.value if backend else None,
+        )
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+
+        job_workers.notify()
+        return job
+
+    @staticmethod
+    async def get_job(
+        job_id: int, current_teacher: Token, db: AsyncSession
+    ) -> EvaluationJob:
+        job = await db.get(EvaluationJob, job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND, detail="Job not found"
+            )
+
+        if job.t_email != current_teacher.email:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You can only view your own evaluation jobs.",
+            )
+        return job
+
+    @staticmethod
+    def _claimable():
+        return or_(
+            EvaluationJob.status == JobStatus.queued,
+            (EvaluationJob.status == JobStatus.running)
+            & (EvaluationJob.lease_expires_at < func.now()),
+        )
+
+    @staticmethod
+    async def _claim(db: AsyncSession, job_id: int | None = None) -> ClaimedJob | None:
+        """
+        Atomically take a queued job (or one whose lease lapsed): the given one, or
+        else the oldest that no other worker is claiming right now.
+        """
+        if job_id is None:
+            job_id = (
+                select(EvaluationJob.id)
+                .where(EvaluationJobService._claimable())
+                .order_by(EvaluationJob.created_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+                .scalar_subquery()
+            )
+
+        claim = f"{WORKER_ID}:{uuid.uuid4().hex}"
+        res = await db.execute(
+            update(EvaluationJob)
+            .where(EvaluationJob.id == job_id, EvaluationJobService._claimable())
+            .values(
+                status=JobStatus.running,
+                worker_id=claim,
+                lease_expires_at=func.now()
+                + timedelta(seconds=settings.EVALUATION_JOB_LEASE_SECONDS),
+                started_at=func.now(),
+                # A reclaimed job starts over (finished answers are not graded again).
+                total_items=None,
+                completed_items=0,
+                failed_items=0,
+            )
+            .returning(
+                EvaluationJob.id,
+                EvaluationJob.qpid,
+                EvaluationJob.s_email,
+                EvaluationJob.t_email,
+                EvaluationJob.backend,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        row = res.one_or_none()
+        await db.commit()
+        return ClaimedJob(*row, claim=claim) if row is not None else None
+
+    @staticmethod
+    async def _renew_lease(job: ClaimedJob, on_lost: Callable[[], None]) -> None:
+        lease = settings.EVALUATION_JOB_LEASE_SECONDS
+        while True:
+            await asyncio.sleep(lease / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    res = await db.execute(
+                        update(EvaluationJob)
+                        .where(
+                            EvaluationJob.id == job.id,
+                            EvaluationJob.worker_id == job.claim,
+                        )
+                        .values(lease_expires_at=func.now() + timedelta(seconds=lease))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            except Exception as exc:
+                logger.warning(
+                    "Job lease renewal failed", job_id=job.id, error=str(exc)
+                )
+                continue
+
+            if res.rowcount == 0:
+                # Another worker reclaimed the job after our lease lapsed.
+                on_lost()
+                return
+
+    @staticmethod
+    async def run_next() -> bool:
+        """Claim and run the next available job; False when there was none."""
+        async with AsyncSessionLocal() as db:
+            job = await EvaluationJobService._claim(db)
+            if job is None:
+                return False
+            await EvaluationJobService._run_claimed(job, db)
+            return True
+
+    @staticmethod
+    async def _run_claimed(job: ClaimedJob, db: AsyncSession) -> None:
+        progress = JobProgress(job_id=job.id)
+        work = asyncio.create_task(EvaluationJobService._execute(job, db, progress))
+        lease_lost = False
+
+        def lose_lease() -> None:
+            nonlocal lease_lost
+            lease_lost = True
+            work.cancel()
+
+        lease = asyncio.create_task(EvaluationJobService._renew_lease(job, lose_lease))
+        try:
+            result, error = await work
+        except asyncio.CancelledError:
+            if not lease_lost:
+                # Shutting down: hand the job back for another worker to pick up.
+                await EvaluationJobService._requeue(job)
+                raise
+            logger.warning("Evaluation job lost its lease", job_id=job.id)
+            return
+        finally:
+            lease.cancel()
+
+        job_status = JobStatus.failed if error else JobStatus.succeeded
+        follow_up_id: int | None = None
+        if result is not None and progress.deferred_answers:
+            follow_up_id = await EvaluationJobService._follow_up(job, progress, db)
+            result = {
+                **result,
+                "deferred": {
+                    "answers": progress.deferred_answers,
+                    "follow_up_job_id": follow_up_id,
+                },
+            }
+        # A worker whose lease lapsed (and was reclaimed) must not overwrite the job.
+        await db.execute(
+            update(EvaluationJob)
+            .where(EvaluationJob.id == job.id, EvaluationJob.worker_id == job.claim)
+            .values(
+                status=job_status,
+                result=result,
+                error=error,
+                lease_expires_at=None,
+                finished_at=datetime.now(timezone.utc),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        progress.finish(job_status.value, error)
+        if follow_up_id is not None:
+            job_workers.notify()
+
+    @staticmethod
+    async def _follow_up(
+        job: ClaimedJob, progress: JobProgress, db: AsyncSession
+    ) -> int | None:
+        """
+        Queue another job for the answers the deadline left pending, in the
+        transaction that finishes this one. Not if nothing at all was graded this
+        time, since the next job would most likely run out of time just the same.
+        """
+        if not progress.done_answers:
+            return None
+        follow_up = EvaluationJob(
+            qpid=job.qpid,
+            s_email=job.s_email,
+            t_email=job.t_email,
+            backend=job.backend,
+        )
+        db.add(follow_up)
+        await db.flush()
+        return follow_up.id
+
+    @staticmethod
+    async def _requeue(job: ClaimedJob) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(EvaluationJob)
+                .where(EvaluationJob.id == job.id, EvaluationJob.worker_id == job.claim)
+                .values(
+                    status=JobStatus.queued,
+                    worker_id=None,
+                    lease_expires_at=None,
+                    started_at=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    @staticmethod
+    async def _execute(
+        job: ClaimedJob, db: AsyncSession, progress: JobProgress
+    ) -> tuple[dict | None, str | None]:
+        """Run the job's evaluation; its result, or the error to report."""
+        teacher = Token(
+            email=job.t_email,
+            role=UserType.teacher.value,
+            exp=datetime.now(timezone.utc),
+        )
+        backend = EvaluationBackendName(job.backend) if job.backend else None
+        try:
+            if job.s_email is None:
+                result = await EvaluationJobService._evaluate_pending(
+                    job.id, job.qpid, teacher, db, backend, progress
+                )
+            else:
+                progress.total_submissions = 1
+                submission = await SubEvaluationService.evaluate_submission(
+                    job.qpid,
+                    job.s_email,
+                    teacher,
+                    db,
+                    backend=backend,
+                    progress=progress,
+                )
+                progress.submission_done(failed=False)
+                result = SubmissionDetailTeacherOut.model_validate(
+                    submission
+                ).model_dump(mode="json")
+        except HTTPException as exc:
+            return None, str(exc.detail)
+        except Exception as exc:
+            logger.error("Evaluation job failed", job_id=job.id, error=str(exc))
+            return None, "Evaluation failed unexpectedly."
+        return result, None
+
+    @staticmethod
+    async def _evaluate_pending(
+        job_id: int,
+        qpid: int,
+        current_teacher: Token,
+        db: AsyncSession,
+        backend: EvaluationBackendName | None,
+        progress: JobProgress,
+    ) -> dict:
+        """
+        Evaluate every pending submission of a paper, a bounded number at a time, each
+        in its own session and within its own deadline. The paper and its questions
+        are loaded once and shared. Near-duplicate answers to a question are graded
+        once: the other members of the cluster sit out their submission's evaluation
+        and take the representative's grade at the end.
+        """
+        paper = await SubEvaluationService._get_own_paper(qpid, current_teacher, db)
+        questions_map = await SubEvaluationService._load_questions(qpid, db)
+
+        s_res = await db.execute(
+            select(Submission.s_email, Submission.evaluated).where(
+                Submission.qpid == qpid
+            )
+        )
+        a_res = await db.execute(select(Answer).where(Answer.qpid == qpid))
+        stale = [
+            a
+            for a in a_res.scalars().all()
+            if a.qid in questions_map and needs_grading(a, questions_map[a.qid])
+        ]
+        stale_students = {a.s_email for a in stale}
+        pending = [
+            s_email
+            for s_email, evaluated in s_res.all()
+            if not evaluated or s_email in stale_students
+        ]
+
+        pending_students = set(pending)
+        _, clusters = SubEvaluationService._cluster(
+            [
+                a
+                for a in stale
+                if a.s_email in pending_students
+                and SubEvaluationService._pre_grade(a, questions_map[a.qid]) is None
+            ]
+        )
+        inherited: dict[str, set[int]] = {}
+        for _, members in clusters:
+            for a in members:
+                inherited.setdefault(a.s_email, set()).add(a.qid)
+
+        progress.total_submissions = len(pending)
+        progress.expected_answers_per_submission = len(questions_map)
+        progress.total_answers = len(pending) * len(questions_map)
+        progress.publish()
+
+        await db.execute(
+            update(EvaluationJob)
+            .where(EvaluationJob.id == job_id)
+            .values(total_items=len(pending))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+        semaphore = asyncio.Semaphore(max(1, settings.EVALUATION_BULK_CONCURRENCY))
+        outcomes: list[dict] = []
+
+        async def evaluate_one(s_email: str) -> None:
+            async with semaphore, AsyncSessionLocal() as session:
+                outcome: dict = {"s_email": s_email, "error": None}
+                try:
+                    submission = await SubEvaluationService.evaluate_submission(
+                        qpid,
+                        s_email,
+                        current_teacher,
+                        session,
+                        backend=backend,
+                        paper=paper,
+                        questions_map=questions_map,
+                        progress=progress,
+                        inherited=inherited.get(s_email),
+                    )
+                    outcome["total_marks_obtained"] = str(
+                        submission.total_marks_obtained
+                    )
+                    counter = EvaluationJob.completed_items
+                except HTTPException as exc:
+                    outcome["error"] = str(exc.detail)
+                    counter = EvaluationJob.failed_items
+                except Exception as exc:
+                    logger.error(
+                        "Bulk evaluation failed", s_email=s_email, error=str(exc)
+                    )
+                    outcome["error"] = "Evaluation failed unexpectedly."
+                    counter = EvaluationJob.failed_items
+
+                outcomes.append(outcome)
+                progress.submission_done(failed=outcome["error"] is not None)
+                await session.execute(
+                    update(EvaluationJob)
+                    .where(EvaluationJob.id == job_id)
+                    .values({counter.key: counter + 1})
+                    .execution_options(synchronize_session=False)
+                )
+                await session.commit()
+
+        await asyncio.gather(*[evaluate_one(s_email) for s_email in pending])
+        updated = await SubEvaluationService._inherit_grades(
+            qpid, clusters, questions_map, db, progress
+        )
+        totals = {sub.s_email: sub.total_marks_obtained for sub in updated}
+        for outcome in outcomes:
+            if outcome["s_email"] in totals and outcome["error"] is None:
+                outcome["total_marks_obtained"] = str(totals[outcome["s_email"]])
+        return {
+            "submissions": outcomes,
+            "inherited": sum(len(members) for _, members in clusters),
+        }
+
+    @staticmethod
+    async def stream_progress(
+        job_id: int, current_teacher: Token, db: AsyncSession
+    ) -> AsyncIterator[str]:
+        """
+        Check access, then return a generator of Server-Sent Events for the job:
+        `progress` on every change and a final `done`. Events come from the workers of
+        this process; when nothing arrives for a while (the job may run on an external
+        worker) the job row is read and its per-submission progress sent instead.
+        """
+        job = await EvaluationJobService.get_job(job_id, current_teacher, db)
+        job_out = EvaluationJobOut.model_validate(job)
+        # The stream may stay open for minutes; do not hold a pooled connection.
+        await db.close()
+
+        return EvaluationJobService._progress_events(job_out)
+
+    @staticmethod
+    async def _progress_events(job: EvaluationJobOut) -> AsyncIterator[str]:
+        if job.status in (JobStatus.succeeded, JobStatus.failed):
+            yield sse_event("done", EvaluationJobService._job_summary(job))
+            return
+
+        queue = progress_broker.subscribe(job.id)
+        try:
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(
+                        queue.get(), timeout=settings.EVALUATION_PROGRESS_KEEPALIVE
+                    )
+                except asyncio.TimeoutError:
+                    async with AsyncSessionLocal() as db:
+                        current = await db.get(EvaluationJob, job.id)
+                    if current is None:
+                        yield ": keep-alive\n\n"
+                        continue
+
+                    current_out = EvaluationJobOut.model_validate(current)
+                    if current.status in (JobStatus.succeeded, JobStatus.failed):
+                        yield sse_event(
+                            "done", EvaluationJobService._job_summary(current_out)
+                        )
+                        return
+                    # Nothing from this process's workers; the job may run on an
+                    # external worker, whose progress is only in the job row.
+                    yield sse_event(
+                        "progress", EvaluationJobService._row_progress(current_out)
+                    )
+                    continue
+
+                yield sse_event(event, data)
+                if event == "done":
+                    return
+        finally:
+            progress_broker.unsubscribe(job.id, queue)
+
+    @staticmethod
+    def _row_progress(job: EvaluationJobOut) -> dict:
+        """Progress as far as the job row records it: per submission, no tokens."""
+        total = job.total_items
+        if total is None and job.s_email is not None:
+            total = 1
+        done = job.completed_items + job.failed_items
+
+        eta_seconds = None
+        if job.started_at is not None and done and total:
+            elapsed = (datetime.now(timezone.utc) - job.started_at).total_seconds()
+            eta_seconds = round(elapsed / done * max(0, total - done), 1)
+
+        return {
+            "job_id": job.id,
+            "status": job.status.value,
+            "total_submissions": total,
+            "done_submissions": done,
+            "failed_submissions": job.failed_items,
+            "eta_seconds": eta_seconds,
+        }
+
+    @staticmethod
+    def _job_summary(job: EvaluationJobOut) -> dict:
+        return job.model_dump(mode="json", exclude={"result"})
+
+
+job_workers = WorkerPool(
+    size=settings.EVALUATION_WORKERS,
+    handler=EvaluationJobService.run_next,
+    poll_interval=settings.EVALUATION_WORKER_POLL_INTERVAL,
+)
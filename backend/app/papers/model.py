@@ -3,6 +3,7 @@ from decimal import Decimal
 from typing import List, Optional
 
 from sqlalchemy import (
+    JSON,
     Boolean,
     DateTime,
     ForeignKey,
@@ -32,6 +33,7 @@ class QuestionPaper(Base):
     duration_minutes: Mapped[Optional[int]] = mapped_column(Integer)
     total_marks: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     is_published: Mapped[bool] = mapped_column(Boolean, default=False)
+    routing_rules: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
@@ -61,6 +63,7 @@ class Question(Base):
     rubric: Mapped[Optional[str]] = mapped_column(Text)
     marks_assigned: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
     sort_order: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    auto_grade_exact_match: Mapped[bool] = mapped_column(Boolean, default=False)
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
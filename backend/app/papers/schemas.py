@@ -3,6 +3,8 @@ from decimal import Decimal
 
 from pydantic import BaseModel, Field
 
+from app.utils.routing import RoutingRules
+
 
 class QuestionCreate(BaseModel):
     question_text: str
@@ -10,6 +12,7 @@ class QuestionCreate(BaseModel):
     rubric: str | None = None
     marks_assigned: Decimal
     sort_order: int = 0
+    auto_grade_exact_match: bool = False
 
 
 class QuestionUpdate(BaseModel):
@@ -19,6 +22,7 @@ class QuestionUpdate(BaseModel):
     rubric: str | None = None
     marks_assigned: Decimal | None = None
     sort_order: int | None = None
+    auto_grade_exact_match: bool | None = None
 
 
 # Question Base & Derived Schemas
@@ -35,6 +39,7 @@ class QuestionBase(BaseModel):
 class QuestionTeacherOut(QuestionBase):
     model_answer: str | None = None
     rubric: str | None = None
+    auto_grade_exact_match: bool = False
     created_at: datetime
     updated_at: datetime | None = None
 
@@ -48,6 +53,7 @@ class QuestionPaperCreate(BaseModel):
     start_date: datetime
     duration_minutes: int | None = None
     is_published: bool = False
+    routing_rules: RoutingRules | None = None
     questions: list[QuestionCreate] = Field(default_factory=list)
 
 
@@ -56,6 +62,7 @@ class QuestionPaperUpdate(BaseModel):
     start_date: datetime | None = None
     duration_minutes: int | None = None
     is_published: bool | None = None
+    routing_rules: RoutingRules | None = None
     questions: list[QuestionUpdate] | None = None
 
 
@@ -73,6 +80,7 @@ class QuestionPaperBase(BaseModel):
 
 
 class QuestionPaperTeacherOut(QuestionPaperBase):
+    routing_rules: RoutingRules | None = None
     created_at: datetime
     updated_at: datetime | None = None
     questions: list[QuestionTeacherOut] = Field(default_factory=list)
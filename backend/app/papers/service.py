@@ -6,9 +6,10 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.auth.model import Association, UserUsage
+from app.auth.model import Association
+from app.auth.quota import Quota
 from app.auth.schemas import Token
-from app.core.model import UserType
+from app.core.model import QuotaKind, UserType
 from app.papers.model import Question, QuestionPaper
 from app.papers.schemas import QuestionPaperCreate, QuestionPaperUpdate
 
@@ -18,11 +19,9 @@ class PaperService:
     async def create_paper(
         paper_in: QuestionPaperCreate, current_teacher: Token, db: AsyncSession
     ) -> QuestionPaper:
-        usage_stmt = select(UserUsage).where(UserUsage.email == current_teacher.email)
-        usage_res = await db.execute(usage_stmt)
-        teacher_usage = usage_res.scalar_one_or_none()
-
-        if teacher_usage and teacher_usage.papers_created_balance_monthly <= 0:
+        # Taken in the same transaction as the insert, so a failed insert refunds it.
+        quota = await Quota.consume(db, current_teacher.email, QuotaKind.papers)
+        if not quota.allowed:
             raise HTTPException(
                 status_code=status.HTTP_402_PAYMENT_REQUIRED,
                 detail="Monthly paper creation limit reached.",
@@ -41,12 +40,6 @@ class PaperService:
             db_paper.questions.append(Question(**q_in.model_dump()))
 
         db.add(db_paper)
-
-        if teacher_usage:
-            teacher_usage.papers_created_balance_monthly -= 1
-            teacher_usage.total_papers_created += 1
-            db.add(teacher_usage)
-
         await db.commit()
         await db.refresh(db_paper)
 
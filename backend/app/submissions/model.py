@@ -8,7 +8,7 @@ from sqlalchemy import ForeignKey, ForeignKeyConstraint, Integer, Numeric, Strin
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
 
-from app.core.model import EvaluationStatus
+from app.core.model import EvaluationSource, EvaluationStatus
 from app.database import Base
 
 
@@ -48,6 +48,14 @@ class Answer(Base):
     status: Mapped[EvaluationStatus] = mapped_column(
         SQLEnum(EvaluationStatus), default=EvaluationStatus.pending
     )
+    evaluation_source: Mapped[Optional[EvaluationSource]] = mapped_column(
+        SQLEnum(EvaluationSource), nullable=True
+    )
+    graded_model: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Hash of the question and answer inputs the current grade was computed from
+    grading_fingerprint: Mapped[Optional[str]] = mapped_column(
+        String(64), nullable=True
+    )
 
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
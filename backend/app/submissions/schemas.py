@@ -4,7 +4,7 @@ from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
-from app.core.model import EvaluationStatus
+from app.core.model import EvaluationSource, EvaluationStatus
 
 
 class AnswerCreate(BaseModel):
@@ -44,7 +44,8 @@ class SubmissionBase(BaseModel):
 
 # Teacher Schemas
 class AnswerTeacherOut(AnswerBase):
-    pass
+    evaluation_source: Optional[EvaluationSource] = None
+    graded_model: Optional[str] = None
 
 
 class SubmissionTeacherOut(SubmissionBase):
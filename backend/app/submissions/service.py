@@ -4,9 +4,9 @@ from fastapi import HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.auth.model import UserUsage
+from app.auth.quota import Quota
 from app.auth.schemas import Token
-from app.core.model import UserType
+from app.core.model import QuotaKind, UserType
 from app.papers.model import QuestionPaper
 from app.submissions.model import Answer, Submission
 from app.submissions.schemas import SubmissionCreate
@@ -26,12 +26,9 @@ class SubmissionService:
                 detail="Only students can submit answers.",
             )
 
-        # Get student usage
-        usage_stmt = select(UserUsage).where(UserUsage.email == current_user.email)
-        usage_res = await db.execute(usage_stmt)
-        student_usage = usage_res.scalar_one_or_none()
-
-        if student_usage and student_usage.submissions_made_balance_monthly <= 0:
+        # Joins the insert's transaction, so a rejected submission is not charged.
+        quota = await Quota.consume(db, current_user.email, QuotaKind.submissions)
+        if not quota.allowed:
             raise HTTPException(
                 status_code=status.HTTP_402_PAYMENT_REQUIRED,
                 detail="Monthly submission limit reached.",
@@ -80,11 +77,6 @@ class SubmissionService:
             db.add(answer_record)
             final_answers.append(answer_record)
 
-        if student_usage:
-            student_usage.submissions_made_balance_monthly -= 1
-            student_usage.total_submissions_made += 1
-            db.add(student_usage)
-
         await db.commit()
         await db.refresh(submission)
 
@@ -0,0 +1,136 @@
+import hashlib
+import json
+from collections import OrderedDict
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.evaluations.model import EvaluationCacheEntry
+from app.utils.logging import logger
+
+
+def normalize_answer(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class EvaluationCache:
+    """
+    Content-addressed cache of evaluation results: an in-process LRU tier in front
+    of the `evaluation_cache` table, which survives restarts and is shared by workers.
+    Values are (score, feedback) tuples.
+    """
+
+    def __init__(self, max_size: int, persistent: bool = True):
+        self.max_size = max_size
+        self.persistent = persistent
+        self.entries: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt_version: str,
+        question: str,
+        teacher_answer: str | None,
+        rubric: str | None,
+        max_marks: float,
+        student_answer: str,
+    ) -> str:
+        payload = json.dumps(
+            [
+                model,
+                prompt_version,
+                question,
+                teacher_answer,
+                rubric,
+                float(max_marks),
+                normalize_answer(student_answer),
+            ]
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _remember(self, key: str, value: tuple[float, str]) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def get_many(self, keys: list[str]) -> dict[str, tuple[float, str]]:
+        found: dict[str, tuple[float, str]] = {}
+        remote_keys = []
+        for key in dict.fromkeys(keys):
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                found[key] = self.entries[key]
+                self.memory_hits += 1
+            else:
+                remote_keys.append(key)
+
+        if remote_keys and self.persistent:
+            try:
+                async with AsyncSessionLocal() as session:
+                    res = await session.execute(
+                        select(EvaluationCacheEntry).where(
+                            EvaluationCacheEntry.key.in_(remote_keys)
+                        )
+                    )
+                    for entry in res.scalars().all():
+                        value = (float(entry.score), entry.feedback)
+                        found[entry.key] = value
+                        self._remember(entry.key, value)
+                        self.persistent_hits += 1
+            except Exception as exc:
+                logger.warning("Evaluation cache lookup failed", error=str(exc))
+
+        self.misses += len([key for key in remote_keys if key not in found])
+        return found
+
+    async def put_many(self, model: str, values: dict[str, tuple[float, str]]) -> None:
+        for key, value in values.items():
+            self._remember(key, value)
+
+        if not values or not self.persistent:
+            return
+
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(
+                    insert(EvaluationCacheEntry)
+                    .values(
+                        [
+                            {
+                                "key": key,
+                                "model": model,
+                                "score": score,
+                                "feedback": feedback,
+                            }
+                            for key, (score, feedback) in values.items()
+                        ]
+                    )
+                    .on_conflict_do_nothing(index_elements=["key"])
+                )
+                await session.commit()
+        except Exception as exc:
+            logger.warning("Evaluation cache write failed", error=str(exc))
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self.entries),
+        }
+
+
+evaluation_cache = EvaluationCache(
+    max_size=settings.EVALUATION_CACHE_SIZE,
+    persistent=settings.EVALUATION_CACHE_PERSISTENT,
+)
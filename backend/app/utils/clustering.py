@@ -0,0 +1,51 @@
+from collections import defaultdict
+
+from app.utils.text import WORD_RE, TfidfVectorizer
+
+
+def shingles(text: str | None) -> list[str]:
+    # Stopwords are kept and word pairs added so "is" and "is not" answers stay apart.
+    if not text:
+        return []
+    words = WORD_RE.findall(text.casefold())
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class AnswerClusterer:
+    """
+    Groups near-duplicate answers to the same question by TF-IDF cosine similarity
+    over word shingles. Each answer joins the most similar existing cluster whose
+    representative it matches at `threshold` or above, otherwise it starts a new one.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+
+    def cluster(self, answers: list[str]) -> list[list[int]]:
+        """Indices of `answers` per cluster; the first index is the representative."""
+        documents = [shingles(answer) for answer in answers]
+        vectorizer = TfidfVectorizer(documents)
+
+        clusters: list[list[int]] = []
+        leaders: list[dict[str, float]] = []
+        # Inverted index over the representatives, so only those sharing a term are scored.
+        postings: dict[str, list[int]] = defaultdict(list)
+
+        for index, doc in enumerate(documents):
+            vector = vectorizer.transform(doc)
+            scores: dict[int, float] = defaultdict(float)
+            for term, weight in vector.items():
+                for leader in postings.get(term, ()):
+                    scores[leader] += weight * leaders[leader][term]
+
+            best = max(scores, key=scores.__getitem__, default=None)
+            if vector and best is not None and scores[best] >= self.threshold:
+                clusters[best].append(index)
+                continue
+
+            clusters.append([index])
+            leaders.append(vector)
+            for term in vector:
+                postings[term].append(len(leaders) - 1)
+
+        return clusters
@@ -0,0 +1,72 @@
+import re
+
+from app.utils.text import estimate_tokens
+
+PARAGRAPH_RE = re.compile(r"\n\s*\n")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+class AnswerCompactor:
+    """
+    Shrinks over-length answers before they are sent for evaluation: whitespace is
+    collapsed, repeated paragraphs are dropped and whatever still exceeds
+    `token_budget` is split into chunks that are graded separately.
+    A budget <= 0 disables chunking.
+    """
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+
+    @staticmethod
+    def compact(text: str) -> str:
+        paragraphs = []
+        seen = set()
+        for paragraph in PARAGRAPH_RE.split(text):
+            cleaned = " ".join(paragraph.split())
+            key = cleaned.casefold()
+            if cleaned and key not in seen:
+                seen.add(key)
+                paragraphs.append(cleaned)
+        return "\n\n".join(paragraphs)
+
+    def _pieces(self, text: str) -> list[str]:
+        # Break the text into units no larger than the budget, preferring paragraph,
+        # then sentence, then word boundaries.
+        pieces = []
+        for paragraph in PARAGRAPH_RE.split(text):
+            if estimate_tokens(paragraph) <= self.token_budget:
+                pieces.append(paragraph)
+                continue
+            for sentence in SENTENCE_RE.split(paragraph):
+                if estimate_tokens(sentence) <= self.token_budget:
+                    pieces.append(sentence)
+                    continue
+                words: list[str] = []
+                for word in sentence.split():
+                    if words and estimate_tokens(" ".join(words + [word])) > (
+                        self.token_budget
+                    ):
+                        pieces.append(" ".join(words))
+                        words = []
+                    words.append(word)
+                if words:
+                    pieces.append(" ".join(words))
+        return pieces
+
+    def chunk(self, text: str) -> list[str]:
+        if self.token_budget <= 0 or estimate_tokens(text) <= self.token_budget:
+            return [text]
+
+        chunks: list[str] = []
+        current: list[str] = []
+        current_tokens = 0
+        for piece in self._pieces(text):
+            piece_tokens = estimate_tokens(piece)
+            if current and current_tokens + piece_tokens > self.token_budget:
+                chunks.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
@@ -1,7 +1,43 @@
-from groq import AsyncGroq
+import asyncio
+import contextvars
+import json
+import random
+import re
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+from groq import APIConnectionError, APIStatusError, AsyncGroq, RateLimitError
 from pydantic import BaseModel, Field
 
 from app.config import settings
+from app.core.model import EvaluationSource
+from app.utils.cache import EvaluationCache, evaluation_cache
+from app.utils.compaction import AnswerCompactor
+from app.utils.logging import logger
+from app.utils.scheduling import (
+    FairScheduler,
+    charge_abandoned,
+    current_deadline,
+    current_tenant,
+    current_usage,
+    tenant_scope,
+    time_left,
+)
+from app.utils.text import (
+    TfidfVectorizer,
+    cosine_similarity,
+    estimate_tokens,
+    tokenize,
+)
+
+T = TypeVar("T")
+
+# Bump whenever the prompts change so cached results from older prompts are not reused.
+PROMPT_VERSION = "2"
 
 SYSTEM_PROMPT = """
 ### Instructions:
@@ -14,6 +50,17 @@ SYSTEM_PROMPT = """
 You must return a JSON object with the keys "score" (A number between 0 and maximum marks alloted, both inclusive) and "feedback". 
 """
 
+BATCH_SYSTEM_PROMPT = """
+### Instructions:
+1) You are a descriptive answer evaluator. You will receive several student answers, each marked with a "qid". Evaluate every answer independently by comparing it to the provided teacher's answer for that question.
+2) If student has not provided an answer, you must return a score of 0.
+3) You must directly address the student in 2nd person and talk like a teacher when providing feedback. Only highlight the mistakes and do not provide the correct answer.
+4) You must follow the evaluation rubric provided for each question.
+5) If no rubric is provided, follow this default rubric and decide the total score as the average: clarity (0-10), relevance (0-10), accuracy (0-10), completeness (0-10).
+
+You must return a JSON object with the key "evaluations", an array containing exactly one object per answer with the keys "qid", "score" (A number between 0 and maximum marks alloted for that question, both inclusive) and "feedback".
+"""
+
 
 class EvaluationResponse(BaseModel):
     score: float = Field(
@@ -25,11 +72,1272 @@ class EvaluationResponse(BaseModel):
         default="",
         description="Feedback to the student highlighting mistakes, without providing the correct answer.",
     )
+    # Model that actually answered, when it may differ from the routed one (a hedge).
+    model: str | None = Field(default=None, exclude=True)
+
+
+class PartialEvaluation(BaseModel):
+    score: float | None = None
+    feedback: str = ""
+
+
+class EvaluationItem(BaseModel):
+    qid: int
+    question: str
+    student_answer: str
+    max_marks: float
+    teacher_answer: str | None = None
+    rubric: str | None = None
+    # Model chosen by the router; None keeps the backend's default model.
+    model: str | None = None
+
+
+class BatchEvaluationItem(EvaluationResponse):
+    qid: int
+
+
+SCORE_RE = re.compile(r'"score"\s*:\s*(-?\d+(?:\.\d+)?)(?=\s*[,}])')
+FEEDBACK_RE = re.compile(r'"feedback"\s*:\s*"')
+JSON_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f"}
+
+
+def parse_partial_evaluation(buffer: str) -> PartialEvaluation:
+    """
+    Pull the score and the feedback received so far out of an incomplete JSON
+    evaluation. The score is only reported once its number is complete.
+    """
+    score_match = SCORE_RE.search(buffer)
+    feedback_match = FEEDBACK_RE.search(buffer)
+
+    chars: list[str] = []
+    if feedback_match:
+        i = feedback_match.end()
+        while i < len(buffer) and buffer[i] != '"':
+            if buffer[i] != "\\":
+                chars.append(buffer[i])
+                i += 1
+                continue
+            if i + 1 >= len(buffer):
+                break
+            escaped = buffer[i + 1]
+            if escaped == "u":
+                try:
+                    chars.append(chr(int(buffer[i + 2 : i + 6], 16)))
+                except ValueError:
+                    break
+                i += 6
+                continue
+            chars.append(JSON_ESCAPES.get(escaped, escaped))
+            i += 2
+
+    return PartialEvaluation(
+        score=float(score_match.group(1)) if score_match else None,
+        feedback="".join(chars),
+    )
+
+
+class RateLimiter:
+    """Token bucket refilled continuously up to `limit_per_minute`. A limit <= 0 disables it."""
+
+    def __init__(self, limit_per_minute: int):
+        self.capacity = float(limit_per_minute)
+        self.rate = limit_per_minute / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(
+            self.capacity, self.available + (now - self.updated) * self.rate
+        )
+        self.updated = now
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        if not self.enabled:
+            return
+
+        # A single request larger than the bucket would otherwise wait forever.
+        amount = min(amount, self.capacity)
+
+        # Holding the lock while sleeping keeps waiters in FIFO order.
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.available >= amount:
+                    self.available -= amount
+                    return
+                await asyncio.sleep((amount - self.available) / self.rate)
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take `amount` only if it is available now and nobody is waiting for it."""
+        if not self.enabled:
+            return True
+        if self.lock.locked():
+            return False
+
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available < amount:
+            return False
+        self.available -= amount
+        return True
+
+    def adjust(self, delta: float) -> None:
+        """Return (positive) or charge (negative) units once the real cost is known."""
+        if not self.enabled:
+            return
+        self._refill()
+        self.available = min(self.capacity, self.available + delta)
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class DeadlineExceededError(Exception):
+    """The evaluation's time budget ran out before the completion did."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive provider failures and fast-fails calls
+    until `reset_timeout` seconds pass, then lets a single trial call through.
+    A threshold <= 0 disables it.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def check(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+
+        state = self.state
+        if state == "open" or (state == "half_open" and self.trial_in_flight):
+            raise CircuitOpenError("LLM provider is unavailable, failing fast.")
+
+    def before_call(self) -> bool:
+        """Admit a call; True when it is the half-open trial."""
+        self.check()
+        if self.failure_threshold > 0 and self.state == "half_open":
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def abandon_trial(self) -> None:
+        # The trial ended without a verdict on the provider (e.g. it was cancelled).
+        self.trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.trial_in_flight = False
+        self.failures += 1
+        if self.opened_at is not None or (0 < self.failure_threshold <= self.failures):
+            self.opened_at = time.monotonic()
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    # APITimeoutError is a subclass of APIConnectionError; TimeoutError is the
+    # dispatcher's own completion timeout.
+    if isinstance(exc, (APIConnectionError, RateLimitError, TimeoutError)):
+        return True
+    return isinstance(exc, APIStatusError) and exc.status_code >= 500
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    if not isinstance(exc, APIStatusError):
+        return None
+
+    headers = exc.response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class Hedger:
+    """
+    Duplicates completions that run past a percentile of recently observed latencies
+    and keeps whichever copy finishes first.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        percentile: float,
+        min_samples: int,
+        window: int = 500,
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.latencies: deque[float] = deque(maxlen=window)
+
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.skipped = 0
+
+    def threshold(self) -> float | None:
+        if not self.enabled or len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+        return ordered[index]
+
+    async def run(
+        self,
+        primary: Callable[[], Awaitable[tuple[T, int]]],
+        hedge: Callable[[], Awaitable[tuple[T, int]]],
+        loser_tokens: int,
+        admit: Callable[[], bool] | None = None,
+    ) -> tuple[T, int]:
+        """
+        Returns the first successful result, which may be the hedge's, so results
+        should say who produced them. A copy cancelled mid-flight has already been
+        billed by the provider, so it is charged `loser_tokens`. The hedge is only
+        sent if `admit` (e.g. the rate limits) lets it through at that moment.
+        """
+        delay = self.threshold()
+        started = time.monotonic()
+        first = asyncio.ensure_future(primary())
+        pending: set[asyncio.Future] = {first}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done and admit is not None and not admit():
+                self.skipped += 1
+                done, _ = await asyncio.wait(pending)
+            if done:
+                result = first.result()
+                self.latencies.append(time.monotonic() - started)
+                return result
+
+            self.hedged += 1
+            second = asyncio.ensure_future(hedge())
+            pending.add(second)
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                successes = [task for task in done if task.exception() is None]
+                if not successes:
+                    error = next(iter(done)).exception()
+                    continue
+
+                self.latencies.append(time.monotonic() - started)
+                if second in successes and first not in successes:
+                    self.hedge_wins += 1
+                response = successes[0].result()[0]
+                tokens_used = sum(task.result()[1] for task in successes)
+                return response, tokens_used + loser_tokens * len(pending)
+
+            assert error is not None
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold_seconds": self.threshold(),
+            "samples": len(self.latencies),
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "skipped": self.skipped,
+        }
+
+
+hedger = Hedger(
+    enabled=settings.LLM_HEDGE_ENABLED,
+    percentile=settings.LLM_HEDGE_PERCENTILE,
+    min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+)
+
+
+class LLMDispatcher:
+    """Process-wide gate every LLM completion goes through."""
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int = 0,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 20.0,
+        circuit_breaker: CircuitBreaker | None = None,
+        tenant_weights: dict[str, float] | None = None,
+        tenant_max_concurrency: int = 0,
+        call_timeout: float = 0.0,
+    ):
+        # Slots are shared fairly between teachers, short requests first within each.
+        self.scheduler = FairScheduler(
+            max_concurrency, weights=tenant_weights, tenant_cap=tenant_max_concurrency
+        )
+        self.request_limiter = RateLimiter(requests_per_minute)
+        self.token_limiter = RateLimiter(tokens_per_minute)
+        self.max_retries = max_retries
+        self.call_timeout = call_timeout or None
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(0, 0)
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.rejected = 0
+
+    def backoff_delay(self, attempt: int, exc: BaseException) -> float | None:
+        """
+        Exponential backoff with full jitter, never sooner than the provider asks.
+        None when the provider asks for a longer wait than `retry_max_delay`.
+        """
+        delay = random.uniform(
+            0, min(self.retry_max_delay, self.retry_base_delay * 2**attempt)
+        )
+        retry_after = retry_after_seconds(exc)
+        if retry_after is not None:
+            if retry_after > self.retry_max_delay:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    async def run(
+        self, call: Callable[[], Awaitable[tuple[T, int]]], estimated_tokens: int
+    ) -> tuple[T, int]:
+        attempt = 0
+        while True:
+            try:
+                self.circuit_breaker.check()
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+
+            try:
+                return await self._attempt(call, estimated_tokens)
+            except CircuitOpenError:
+                self.rejected += 1
+                raise
+            except Exception as exc:
+                if not is_transient_error(exc):
+                    raise
+                # Rate limiting means the provider is up, so it does not trip the breaker.
+                if isinstance(exc, RateLimitError):
+                    self.circuit_breaker.record_success()
+                else:
+                    self.circuit_breaker.record_failure()
+                delay = self.backoff_delay(attempt, exc)
+                left = time_left()
+                if (
+                    attempt >= self.max_retries
+                    or delay is None
+                    or (left is not None and delay >= left)
+                ):
+                    raise
+
+                await asyncio.sleep(delay)
+                attempt += 1
+                self.retried += 1
+
+    async def _attempt(
+        self, call: Callable[[], Awaitable[tuple[T, int]]], estimated_tokens: int
+    ) -> tuple[T, int]:
+        tenant = current_tenant.get()
+        self.waiting += 1
+        try:
+            await self.scheduler.acquire(tenant, estimated_tokens)
+        finally:
+            self.waiting -= 1
+
+        is_trial = False
+        try:
+            # The trial slot is taken only once the call holds a dispatcher slot.
+            is_trial = self.circuit_breaker.before_call()
+            await self.request_limiter.acquire()
+            await self.token_limiter.acquire(estimated_tokens)
+
+            timeout, by_deadline = self._timeout()
+            if by_deadline and timeout <= 0:
+                raise DeadlineExceededError()
+
+            self.in_flight += 1
+            try:
+                result, tokens_used = await asyncio.wait_for(call(), timeout=timeout)
+            except BaseException as exc:
+                if isinstance(exc, (asyncio.CancelledError, TimeoutError)):
+                    # Cut off mid-flight; the provider still bills the prompt and
+                    # whatever it generated.
+                    charge_abandoned(estimated_tokens)
+                if isinstance(exc, TimeoutError) and by_deadline:
+                    raise DeadlineExceededError() from exc
+                if isinstance(exc, Exception):
+                    self.failed += 1
+                    if not is_transient_error(exc):
+                        # The provider answered; only the payload was unusable.
+                        self.circuit_breaker.record_success()
+                raise
+            finally:
+                self.in_flight -= 1
+
+            self.completed += 1
+            self.circuit_breaker.record_success()
+            self.token_limiter.adjust(estimated_tokens - tokens_used)
+            return result, tokens_used
+        except BaseException as exc:
+            # Cancelled, or out of time: the provider gave no verdict either way.
+            if is_trial and (
+                not isinstance(exc, Exception) or isinstance(exc, DeadlineExceededError)
+            ):
+                self.circuit_breaker.abandon_trial()
+            raise
+        finally:
+            self.scheduler.release(tenant)
+
+    def _timeout(self) -> tuple[float | None, bool]:
+        """The per-call timeout, and whether the context's deadline shortened it."""
+        left = time_left()
+        if left is None or (
+            self.call_timeout is not None and self.call_timeout <= left
+        ):
+            return self.call_timeout, False
+        return left, True
+
+    def try_admit(self, estimated_tokens: int) -> bool:
+        """
+        Take one request and `estimated_tokens` from the rate limits without waiting,
+        for an extra call within a slot already held (a hedge).
+        """
+        if not self.request_limiter.try_acquire():
+            return False
+        if not self.token_limiter.try_acquire(estimated_tokens):
+            self.request_limiter.adjust(1)
+            return False
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "waiting": self.waiting,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "circuit": self.circuit_breaker.state,
+            "scheduler": self.scheduler.stats(),
+        }
+
+
+dispatcher = LLMDispatcher(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_retries=settings.LLM_MAX_RETRIES,
+    retry_base_delay=settings.LLM_RETRY_BASE_DELAY,
+    retry_max_delay=settings.LLM_RETRY_MAX_DELAY,
+    circuit_breaker=CircuitBreaker(
+        failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout=settings.LLM_CIRCUIT_RESET_SECONDS,
+    ),
+    tenant_weights=settings.LLM_TENANT_WEIGHTS,
+    tenant_max_concurrency=settings.LLM_TENANT_MAX_CONCURRENCY,
+    call_timeout=settings.LLM_COMPLETION_TIMEOUT,
+)
+
+
+class EvaluationBackend(ABC):
+    name: str
+    source: EvaluationSource
+    model: str
+    cacheable: bool = True
+    # Remote backends grade answers one completion at a time unless batching is enabled.
+    remote: bool = True
+    streaming: bool = False
+
+    @abstractmethod
+    async def evaluate(self, item: EvaluationItem) -> tuple[EvaluationResponse, int]:
+        pass
+
+    async def evaluate_streaming(
+        self,
+        item: EvaluationItem,
+        on_partial: Callable[[PartialEvaluation], None],
+    ) -> tuple[EvaluationResponse, int]:
+        return await self.evaluate(item)
+
+    def model_for(self, item: EvaluationItem) -> str:
+        return self.model
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def estimate(self, items: list[EvaluationItem], batched: bool = False) -> int:
+        """Upper-bound token cost of grading `items`, computed locally."""
+        return 0
+
+    async def evaluate_batch(
+        self, items: list[EvaluationItem]
+    ) -> tuple[dict[int, EvaluationResponse], int]:
+        outcomes = await asyncio.gather(
+            *[self.evaluate(item) for item in items], return_exceptions=True
+        )
+        results: dict[int, EvaluationResponse] = {}
+        tokens_used = 0
+        for item, outcome in zip(items, outcomes):
+            if isinstance(outcome, BaseException):
+                continue
+            results[item.qid] = outcome[0]
+            tokens_used += outcome[1]
+        return results, tokens_used
+
+
+class GroqBackend(EvaluationBackend):
+    name = "groq"
+    source = EvaluationSource.llm
+    model = "llama-3.3-70b-versatile"
+    streaming = True
+    max_completion_tokens = 256
+    max_batch_completion_tokens = 8192
+
+    def __init__(self):
+        self._client: AsyncGroq | None = None
+        self._http_client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> AsyncGroq:
+        # Created on first use when the app lifespan has not started it (scripts, tests).
+        if self._client is None:
+            self._client = self._build_client()
+        return self._client
+
+    def _build_client(self) -> AsyncGroq:
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            settings.LLM_REQUEST_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT
+        )
+        try:
+            self._http_client = httpx.AsyncClient(
+                limits=limits, timeout=timeout, http2=settings.LLM_HTTP2
+            )
+        except ImportError:
+            logger.warning("HTTP/2 requested but the h2 package is not installed")
+            self._http_client = httpx.AsyncClient(limits=limits, timeout=timeout)
+
+        # Retries are handled by the dispatcher, so the SDK's own retry loop is disabled.
+        return AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            max_retries=0,
+            timeout=timeout,
+            http_client=self._http_client,
+        )
+
+    async def start(self) -> None:
+        self._client = self._build_client()
+        if not settings.LLM_WARMUP_ON_STARTUP:
+            return
+
+        # Open a pooled connection (DNS, TCP, TLS) before the first evaluation needs it.
+        try:
+            await self._client.models.list()
+        except Exception as exc:
+            logger.warning("LLM client warm-up failed", error=str(exc))
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+        self._client = None
+        self._http_client = None
+
+    def pool_stats(self) -> dict:
+        pool = getattr(getattr(self._http_client, "_transport", None), "_pool", None)
+        if pool is None:
+            return {"open": False}
+
+        connections = list(pool.connections)
+        return {
+            "open": True,
+            "http2": pool._http2,
+            "max_connections": settings.LLM_HTTP_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            "connections": len(connections),
+            "idle_connections": sum(1 for c in connections if c.is_idle()),
+            "in_flight_requests": len(pool._requests),
+        }
+
+    @staticmethod
+    def _format_answer(item: EvaluationItem) -> str:
+        return f"Question: {item.question}\nTeacher's Answer: {item.teacher_answer or 'None provided'}\nStudent's Answer: {item.student_answer}\nEvaluation Rubric: {item.rubric or 'None provided'} \nMax Marks: {item.max_marks}"
+
+    def _estimate_single(self, item: EvaluationItem) -> int:
+        return (
+            estimate_tokens(SYSTEM_PROMPT.strip() + self._format_answer(item).strip())
+            + self.max_completion_tokens
+        )
+
+    def _batch_prompt(self, items: list[EvaluationItem]) -> str:
+        return "\n\n".join(
+            f"qid: {item.qid}\n" + self._format_answer(item) for item in items
+        )
+
+    def _batch_max_tokens(self, count: int) -> int:
+        return min(self.max_completion_tokens * count, self.max_batch_completion_tokens)
+
+    def estimate(self, items: list[EvaluationItem], batched: bool = False) -> int:
+        if not items:
+            return 0
+        if not batched:
+            return sum(self._estimate_single(item) for item in items)
+        return estimate_tokens(
+            BATCH_SYSTEM_PROMPT.strip() + self._batch_prompt(items).strip()
+        ) + self._batch_max_tokens(len(items))
+
+    def _messages(self, item: EvaluationItem) -> list[dict]:
+        to_eval = self._format_answer(item)
+
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT.strip(),
+            },
+            {
+                "role": "user",
+                "content": to_eval.strip(),
+            },
+        ]
+
+    def model_for(self, item: EvaluationItem) -> str:
+        return item.model or self.model
+
+    async def evaluate(self, item: EvaluationItem) -> tuple[EvaluationResponse, int]:
+        messages = self._messages(item)
+        model = self.model_for(item)
+        estimated_tokens = self._estimate_single(item)
+
+        async def hedge() -> tuple[EvaluationResponse, int]:
+            try:
+                return await self._complete(messages, settings.LLM_HEDGE_MODEL or model)
+            finally:
+                # Held while in flight; the dispatcher charges what both copies
+                # actually used on return.
+                dispatcher.token_limiter.adjust(estimated_tokens)
+
+        # A hedge shares the primary's dispatcher slot but is sent only when the rate
+        # limits have room for another request right away.
+        return await dispatcher.run(
+            lambda: hedger.run(
+                lambda: self._complete(messages, model),
+                hedge,
+                loser_tokens=estimated_tokens,
+                admit=lambda: dispatcher.try_admit(estimated_tokens),
+            ),
+            estimated_tokens=estimated_tokens,
+        )
+
+    async def evaluate_streaming(
+        self,
+        item: EvaluationItem,
+        on_partial: Callable[[PartialEvaluation], None],
+    ) -> tuple[EvaluationResponse, int]:
+        messages = self._messages(item)
+        model = self.model_for(item)
+        return await dispatcher.run(
+            lambda: self._complete_streaming(messages, model, on_partial),
+            estimated_tokens=self._estimate_single(item),
+        )
+
+    async def _complete(
+        self, messages: list[dict], model: str
+    ) -> tuple[EvaluationResponse, int]:
+        completion = await self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            max_tokens=self.max_completion_tokens,
+            response_format={"type": "json_object"},
+            temperature=0.4,
+        )
+
+        evaluation_response = EvaluationResponse.model_validate_json(
+            json_data=completion.choices[0].message.content or ""
+        )
+        evaluation_response.model = model
+
+        tokens_used = completion.usage.total_tokens if completion.usage else 0
+
+        return evaluation_response, tokens_used
+
+    async def _complete_streaming(
+        self,
+        messages: list[dict],
+        model: str,
+        on_partial: Callable[[PartialEvaluation], None],
+    ) -> tuple[EvaluationResponse, int]:
+        # JSON mode is not available for streamed completions, so the object is cut
+        # out of the text once the stream ends.
+        stream = await self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            max_tokens=self.max_completion_tokens,
+            temperature=0.4,
+            stream=True,
+        )
+
+        content = ""
+        tokens_used = 0
+        last_partial: PartialEvaluation | None = None
+        async for chunk in stream:
+            usage = chunk.usage or (chunk.x_groq.usage if chunk.x_groq else None)
+            if usage:
+                tokens_used = usage.total_tokens
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+
+            content += chunk.choices[0].delta.content
+            partial = parse_partial_evaluation(content)
+            if partial != last_partial:
+                on_partial(partial)
+                last_partial = partial
+
+        start, end = content.find("{"), content.rfind("}")
+        evaluation_response = EvaluationResponse.model_validate_json(
+            json_data=content[start : end + 1] if start != -1 else content
+        )
+        evaluation_response.model = model
+
+        return evaluation_response, tokens_used
+
+    async def evaluate_batch(
+        self, items: list[EvaluationItem]
+    ) -> tuple[dict[int, EvaluationResponse], int]:
+        """
+        Grade all answers of one submission in a single completion per routed model.
+        Answers missing from a malformed response are retried one by one; answers
+        that still fail, or whose completion failed, are left out of the returned
+        mapping.
+        """
+        if not items:
+            return {}, 0
+
+        groups: dict[str, list[EvaluationItem]] = {}
+        for item in items:
+            groups.setdefault(self.model_for(item), []).append(item)
+
+        outcomes = await asyncio.gather(
+            *[self._evaluate_group(group, model) for model, group in groups.items()],
+            return_exceptions=True,
+        )
+        results: dict[int, EvaluationResponse] = {}
+        tokens_used = 0
+        for outcome in outcomes:
+            # Out of time the answers stay pending instead of being failed.
+            if isinstance(outcome, DeadlineExceededError):
+                raise outcome
+            if isinstance(outcome, BaseException):
+                continue
+            results.update(outcome[0])
+            tokens_used += outcome[1]
+        return results, tokens_used
+
+    async def _evaluate_group(
+        self, items: list[EvaluationItem], model: str
+    ) -> tuple[dict[int, EvaluationResponse], int]:
+        to_eval = self._batch_prompt(items)
+        messages = [
+            {
+                "role": "system",
+                "content": BATCH_SYSTEM_PROMPT.strip(),
+            },
+            {
+                "role": "user",
+                "content": to_eval.strip(),
+            },
+        ]
+        max_tokens = self._batch_max_tokens(len(items))
+
+        raw_results, tokens_used = await dispatcher.run(
+            lambda: self._complete_batch(messages, max_tokens, model),
+            estimated_tokens=self.estimate(items, batched=True),
+        )
+
+        max_marks = {item.qid: item.max_marks for item in items}
+        results: dict[int, EvaluationResponse] = {}
+        for raw in raw_results:
+            try:
+                entry = BatchEvaluationItem.model_validate(raw)
+            except ValueError:
+                continue
+            if entry.qid in max_marks and entry.qid not in results:
+                results[entry.qid] = EvaluationResponse(
+                    score=min(entry.score, max_marks[entry.qid]),
+                    feedback=entry.feedback,
+                )
+
+        missing = [item for item in items if item.qid not in results]
+        fallbacks = await asyncio.gather(
+            *[self.evaluate(item) for item in missing],
+            return_exceptions=True,
+        )
+        for item, outcome in zip(missing, fallbacks):
+            if isinstance(outcome, BaseException):
+                continue
+            evaluation_response, tokens = outcome
+            results[item.qid] = evaluation_response
+            tokens_used += tokens
+
+        return results, tokens_used
+
+    async def _complete_batch(
+        self, messages: list[dict], max_tokens: int, model: str
+    ) -> tuple[list, int]:
+        completion = await self.client.chat.completions.create(
+            messages=messages,
+            model=model,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            temperature=0.4,
+        )
+
+        tokens_used = completion.usage.total_tokens if completion.usage else 0
+
+        try:
+            payload = json.loads(completion.choices[0].message.content or "")
+        except ValueError:
+            return [], tokens_used
+
+        evaluations = payload.get("evaluations") if isinstance(payload, dict) else None
+        if not isinstance(evaluations, list):
+            return [], tokens_used
+
+        return evaluations, tokens_used
+
+
+HEURISTIC_FEEDBACK = [
+    (0.85, "Your answer covers the key points expected for this question."),
+    (
+        0.5,
+        "Your answer covers some of the key points, but you have left out important details.",
+    ),
+    (
+        0.0001,
+        "Your answer touches on the topic, but you have missed most of the key points.",
+    ),
+    (0.0, "Your answer does not address the key points of this question."),
+]
+
+
+class HeuristicBackend(EvaluationBackend):
+    """
+    Fully local CPU grader: TF-IDF similarity and keyword coverage between the student
+    answer and the model answer (or the question when none is given), plus rubric
+    keyword coverage. Costs no tokens, so it suits quota fallback and load tests.
+    """
+
+    name = "heuristic"
+    source = EvaluationSource.heuristic
+    model = "heuristic-tfidf-v1"
+    cacheable = False
+    remote = False
+
+    # Words that carry marking instructions rather than subject content.
+    rubric_noise = frozenset(
+        "mark marks give point points award full partial each correct answer".split()
+    )
+
+    async def evaluate(self, item: EvaluationItem) -> tuple[EvaluationResponse, int]:
+        results, tokens_used = await self.evaluate_batch([item])
+        return results[item.qid], tokens_used
+
+    async def evaluate_batch(
+        self, items: list[EvaluationItem]
+    ) -> tuple[dict[int, EvaluationResponse], int]:
+        documents = []
+        for item in items:
+            documents.append(tokenize(item.teacher_answer or item.question))
+            documents.append(tokenize(item.student_answer))
+        vectorizer = TfidfVectorizer(documents)
+
+        return {item.qid: self.grade(item, vectorizer) for item in items}, 0
+
+    def grade(
+        self, item: EvaluationItem, vectorizer: TfidfVectorizer
+    ) -> EvaluationResponse:
+        answer_terms = tokenize(item.student_answer)
+        reference_terms = tokenize(item.teacher_answer) or tokenize(item.question)
+        if not answer_terms or not reference_terms:
+            return EvaluationResponse(score=0.0, feedback=self.feedback(0.0))
+
+        similarity = cosine_similarity(
+            vectorizer.transform(answer_terms), vectorizer.transform(reference_terms)
+        )
+        answer_set = set(answer_terms)
+        reference_set = set(reference_terms)
+        coverage = len(reference_set & answer_set) / len(reference_set)
+        fraction = 0.5 * similarity + 0.5 * coverage
+
+        rubric_terms = {
+            term
+            for term in tokenize(item.rubric)
+            if term not in self.rubric_noise and not term.isdigit()
+        }
+        if rubric_terms:
+            rubric_coverage = len(rubric_terms & answer_set) / len(rubric_terms)
+            fraction = 0.8 * fraction + 0.2 * rubric_coverage
+
+        # Round to the nearest half mark.
+        score = min(item.max_marks, round(item.max_marks * fraction * 2) / 2)
+        return EvaluationResponse(score=score, feedback=self.feedback(fraction))
+
+    @staticmethod
+    def feedback(fraction: float) -> str:
+        for threshold, message in HEURISTIC_FEEDBACK:
+            if fraction >= threshold:
+                return message
+        return HEURISTIC_FEEDBACK[-1][1]
+
+
+backends: dict[str, EvaluationBackend] = {
+    backend.name: backend for backend in (GroqBackend(), HeuristicBackend())
+}
+
+
+@dataclass
+class BatchEntry:
+    item: EvaluationItem
+    future: asyncio.Future
+    # Item whose cache entry the result fills if the caller stops waiting for it
+    origin: EvaluationItem
+    deadline: float | None
+    on_usage: Callable[[int], None] | None
+
+
+class MicroBatcher:
+    """
+    Collects single-answer evaluations from concurrent callers of the same tenant for
+    up to `window` seconds (or until `max_size` are waiting), grades them with one
+    batched completion and hands every caller its own result. Tokens of a batch are
+    split between its answers in proportion to their prompt size. A window <= 0
+    disables batching.
+
+    Batches run in a context of their own, not the first caller's: the tenant,
+    deadline and usage callback of every caller travel with its entry. A caller that
+    gave up is still charged its share, and its result is cached.
+    """
+
+    def __init__(self, window: float, max_size: int):
+        self.window = window
+        self.max_size = max_size
+        self.pending: dict[tuple[str, str], list[BatchEntry]] = {}
+        self.timers: dict[tuple[str, str], asyncio.TimerHandle] = {}
+        self.tasks: set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batched_items = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and self.max_size > 1
+
+    async def submit(
+        self,
+        backend: EvaluationBackend,
+        item: EvaluationItem,
+        origin: EvaluationItem | None = None,
+    ) -> tuple[EvaluationResponse, int]:
+        loop = asyncio.get_running_loop()
+        entry = BatchEntry(
+            item=item,
+            future=loop.create_future(),
+            origin=origin or item,
+            deadline=current_deadline.get(),
+            on_usage=current_usage.get(),
+        )
+
+        key = (backend.name, current_tenant.get())
+        queue = self.pending.setdefault(key, [])
+        queue.append(entry)
+        if len(queue) >= self.max_size:
+            self._flush(backend, key)
+        elif len(queue) == 1:
+            self.timers[key] = loop.call_later(
+                self.window, self._flush, backend, key, context=contextvars.Context()
+            )
+
+        return await entry.future
+
+    def _flush(self, backend: EvaluationBackend, key: tuple[str, str]) -> None:
+        timer = self.timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+        # Callers that gave up while waiting for the window are not graded at all.
+        batch = [
+            entry for entry in self.pending.pop(key, []) if not entry.future.done()
+        ]
+        if batch:
+            task = asyncio.create_task(
+                self._run(backend, key[1], batch), context=contextvars.Context()
+            )
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def _run(
+        self, backend: EvaluationBackend, tenant: str, batch: list[BatchEntry]
+    ) -> None:
+        # A caller without a deadline must not be cut short by one with a deadline.
+        deadlines = [entry.deadline for entry in batch]
+        deadline = None if None in deadlines else max(deadlines)
+
+        if len(batch) == 1:
+            entry = batch[0]
+            try:
+                with tenant_scope(tenant, deadline, entry.on_usage):
+                    outcome = await backend.evaluate(entry.item)
+            except Exception as exc:
+                if not entry.future.done():
+                    entry.future.set_exception(exc)
+                return
+            await self._deliver(backend, entry, outcome)
+            return
+
+        # Answers from different submissions may share a qid, so re-key by position.
+        items = [
+            entry.item.model_copy(update={"qid": index})
+            for index, entry in enumerate(batch)
+        ]
+        try:
+            with tenant_scope(tenant, deadline, self._charge_all(batch)):
+                results, tokens_used = await backend.evaluate_batch(items)
+        except Exception as exc:
+            for entry in batch:
+                if not entry.future.done():
+                    entry.future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.batched_items += len(batch)
+
+        weights = {
+            index: estimate_tokens(items[index].question + items[index].student_answer)
+            for index in results
+        }
+        total_weight = sum(weights.values()) or 1
+        for index, entry in enumerate(batch):
+            if index in results:
+                share = round(tokens_used * weights[index] / total_weight)
+                await self._deliver(backend, entry, (results[index], share))
+            elif not entry.future.done():
+                entry.future.set_exception(
+                    RuntimeError("Answer was not graded by the batched completion.")
+                )
+
+    @staticmethod
+    def _charge_all(batch: list[BatchEntry]) -> Callable[[int], None]:
+        """Split tokens abandoned mid-flight evenly between the callers."""
+
+        def charge(tokens: int) -> None:
+            for entry in batch:
+                if entry.on_usage is not None:
+                    entry.on_usage(tokens // len(batch))
+
+        return charge
+
+    @staticmethod
+    async def _deliver(
+        backend: EvaluationBackend,
+        entry: BatchEntry,
+        outcome: tuple[EvaluationResponse, int],
+    ) -> None:
+        if not entry.future.done():
+            entry.future.set_result(outcome)
+            return
+
+        # The caller was cancelled while its answer was being graded: bill the
+        # tokens to it anyway and keep the result for its next attempt.
+        response, tokens = outcome
+        if entry.on_usage is not None:
+            entry.on_usage(tokens)
+        try:
+            await EvaluationService.remember(backend, entry.origin, response)
+        except Exception as exc:
+            logger.warning("Caching an abandoned result failed", error=str(exc))
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "pending": sum(len(queue) for queue in self.pending.values()),
+        }
+
+
+micro_batcher = MicroBatcher(
+    window=settings.LLM_MICRO_BATCH_WINDOW_MS / 1000,
+    max_size=settings.LLM_MICRO_BATCH_MAX_SIZE,
+)
+
+compactor = AnswerCompactor(token_budget=settings.LLM_ANSWER_TOKEN_BUDGET)
+
+CHUNK_NOTE = "(This is part {part} of {parts} of a long student answer, worth {marks} of the question's {max_marks} marks. Only award marks for the points covered in this part.)"
 
 
 class EvaluationService:
-    client = AsyncGroq(api_key=settings.GROQ_API_KEY)
-    eval_model = "llama-3.3-70b-versatile"
+    @staticmethod
+    async def startup() -> None:
+        for engine in backends.values():
+            await engine.start()
+
+    @staticmethod
+    async def shutdown() -> None:
+        for engine in backends.values():
+            await engine.close()
+
+    @staticmethod
+    def stats() -> dict:
+        groq_backend = backends["groq"]
+        return {
+            "dispatcher": dispatcher.stats(),
+            "hedging": hedger.stats(),
+            "micro_batcher": micro_batcher.stats(),
+            "http_pool": (
+                groq_backend.pool_stats()
+                if isinstance(groq_backend, GroqBackend)
+                else {"open": False}
+            ),
+        }
+
+    @staticmethod
+    def get_backend(name: str | None = None) -> EvaluationBackend:
+        name = name or settings.EVALUATION_BACKEND
+        if name not in backends:
+            raise ValueError(f"Unknown evaluation backend: {name}")
+        return backends[name]
+
+    @classmethod
+    def estimate(cls, items: list[EvaluationItem], backend: str | None = None) -> int:
+        engine = cls.get_backend(backend)
+        prepared = [cls.prepare(item) for item in items]
+        whole = [parts[0] for parts in prepared if len(parts) == 1]
+        chunks = [part for parts in prepared if len(parts) > 1 for part in parts]
+        return engine.estimate(
+            whole, batched=settings.LLM_BATCH_EVALUATION
+        ) + engine.estimate(chunks)
+
+    @staticmethod
+    def prepare(item: EvaluationItem) -> list[EvaluationItem]:
+        """
+        Compact the student answer and, if it is still over the per-question token
+        budget, split it into parts that are scored separately. Each part is marked
+        out of a share of the question's marks in proportion to its length, so the
+        part scores add up to a score for the whole answer.
+        """
+        compacted = compactor.compact(item.student_answer)
+        chunks = compactor.chunk(compacted)
+        if len(chunks) == 1:
+            return [item.model_copy(update={"student_answer": compacted})]
+
+        weights = [estimate_tokens(chunk) for chunk in chunks]
+        shares = [round(item.max_marks * w / sum(weights), 2) for w in weights]
+        shares[-1] = round(item.max_marks - sum(shares[:-1]), 2)
+        return [
+            item.model_copy(
+                update={
+                    "question": f"{item.question}\n"
+                    + CHUNK_NOTE.format(
+                        part=index,
+                        parts=len(chunks),
+                        marks=share,
+                        max_marks=item.max_marks,
+                    ),
+                    "student_answer": chunk,
+                    "max_marks": share,
+                }
+            )
+            for index, (chunk, share) in enumerate(zip(chunks, shares), start=1)
+        ]
+
+    @staticmethod
+    def merge(
+        item: EvaluationItem,
+        parts: list[EvaluationItem],
+        responses: list[EvaluationResponse],
+    ) -> EvaluationResponse:
+        """Add up the part scores, each capped at the part's share of the marks."""
+        score = sum(
+            min(response.score, part.max_marks)
+            for part, response in zip(parts, responses)
+        )
+        models = {response.model for response in responses}
+        return EvaluationResponse(
+            score=min(item.max_marks, round(score, 2)),
+            feedback="\n".join(
+                f"Part {index}: {response.feedback}"
+                for index, response in enumerate(responses, start=1)
+            ),
+            # Parts answered by different models are filed under the routed one.
+            model=models.pop() if len(models) == 1 else None,
+        )
+
+    @classmethod
+    async def _grade(
+        cls, engine: EvaluationBackend, item: EvaluationItem
+    ) -> tuple[EvaluationResponse, int]:
+        parts = cls.prepare(item) if engine.remote else [item]
+        if len(parts) == 1:
+            if engine.remote and micro_batcher.enabled:
+                return await micro_batcher.submit(engine, parts[0], origin=item)
+            return await engine.evaluate(parts[0])
+
+        outcomes = await asyncio.gather(*[engine.evaluate(part) for part in parts])
+        return (
+            cls.merge(item, parts, [response for response, _ in outcomes]),
+            sum(tokens for _, tokens in outcomes),
+        )
+
+    @staticmethod
+    def cache_key(
+        item: EvaluationItem, backend: EvaluationBackend, model: str | None = None
+    ) -> str:
+        return EvaluationCache.make_key(
+            model=model or backend.model_for(item),
+            prompt_version=PROMPT_VERSION,
+            question=item.question,
+            teacher_answer=item.teacher_answer,
+            rubric=item.rubric,
+            max_marks=item.max_marks,
+            student_answer=item.student_answer,
+        )
 
     @classmethod
     async def evaluate(
@@ -39,30 +1347,131 @@ class EvaluationService:
         max_marks: float,
         teacher_answer: str | None = None,
         rubric: str | None = None,
+        backend: str | None = None,
+        model: str | None = None,
     ) -> tuple[EvaluationResponse, int]:
-        to_eval = f"Question: {question}\nTeacher's Answer: {teacher_answer or 'None provided'}\nStudent's Answer: {student_answer}\nEvaluation Rubric: {rubric or 'None provided'} \nMax Marks: {max_marks}"
-
-        completion = await cls.client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": SYSTEM_PROMPT.strip(),
-                },
-                {
-                    "role": "user",
-                    "content": to_eval.strip(),
-                },
-            ],
-            model=cls.eval_model,
-            max_tokens=256,
-            response_format={"type": "json_object"},
-            temperature=0.4,
+        engine = cls.get_backend(backend)
+        item = EvaluationItem(
+            qid=0,
+            question=question,
+            student_answer=student_answer,
+            max_marks=max_marks,
+            teacher_answer=teacher_answer,
+            rubric=rubric,
+            model=model,
         )
+        return await cls._cached(engine, item, lambda: cls._grade(engine, item))
 
-        evaluation_response = EvaluationResponse.model_validate_json(
-            json_data=completion.choices[0].message.content or ""
+    @classmethod
+    async def evaluate_streaming(
+        cls,
+        item: EvaluationItem,
+        on_partial: Callable[[PartialEvaluation], None],
+        backend: str | None = None,
+    ) -> tuple[EvaluationResponse, int]:
+        """
+        Grade one answer, reporting the partial result as the completion streams in.
+        Cache hits and answers graded in parts are returned without partial updates.
+        """
+        engine = cls.get_backend(backend)
+        parts = cls.prepare(item)
+        if not engine.streaming or len(parts) > 1:
+            return await cls._cached(engine, item, lambda: cls._grade(engine, item))
+
+        return await cls._cached(
+            engine, item, lambda: engine.evaluate_streaming(parts[0], on_partial)
         )
 
-        tokens_used = completion.usage.total_tokens if completion.usage else 0
+    @classmethod
+    async def _cached(
+        cls,
+        engine: EvaluationBackend,
+        item: EvaluationItem,
+        grade: Callable[[], Awaitable[tuple[EvaluationResponse, int]]],
+    ) -> tuple[EvaluationResponse, int]:
+        if not engine.cacheable:
+            return await grade()
+
+        key = cls.cache_key(item, engine)
+        cached = await evaluation_cache.get_many([key])
+        if key in cached:
+            score, feedback = cached[key]
+            return EvaluationResponse(score=score, feedback=feedback), 0
 
+        evaluation_response, tokens_used = await grade()
+        await cls.remember(engine, item, evaluation_response)
         return evaluation_response, tokens_used
+
+    @classmethod
+    async def remember(
+        cls,
+        engine: EvaluationBackend,
+        item: EvaluationItem,
+        response: EvaluationResponse,
+    ) -> None:
+        if not engine.cacheable:
+            return
+        model = response.model or engine.model_for(item)
+        await evaluation_cache.put_many(
+            model,
+            {cls.cache_key(item, engine, model): (response.score, response.feedback)},
+        )
+
+    @classmethod
+    async def evaluate_batch(
+        cls, items: list[EvaluationItem], backend: str | None = None
+    ) -> tuple[dict[int, EvaluationResponse], int]:
+        """
+        Grade several answers of one submission together. Items that could not be
+        graded are left out of the returned mapping.
+        """
+        if not items:
+            return {}, 0
+
+        engine = cls.get_backend(backend)
+        if not engine.cacheable:
+            return await engine.evaluate_batch(items)
+
+        keys = {item.qid: cls.cache_key(item, engine) for item in items}
+        cached = await evaluation_cache.get_many(list(keys.values()))
+
+        results: dict[int, EvaluationResponse] = {}
+        for item in items:
+            if keys[item.qid] in cached:
+                score, feedback = cached[keys[item.qid]]
+                results[item.qid] = EvaluationResponse(score=score, feedback=feedback)
+
+        pending = [item for item in items if item.qid not in results]
+        if not pending:
+            return results, 0
+
+        prepared = {item.qid: cls.prepare(item) for item in pending}
+        graded, tokens_used = await engine.evaluate_batch(
+            [parts[0] for parts in prepared.values() if len(parts) == 1]
+        )
+
+        # Over-length answers are graded part by part outside the batch.
+        long_items = [item for item in pending if len(prepared[item.qid]) > 1]
+        outcomes = await asyncio.gather(
+            *[cls._grade(engine, item) for item in long_items],
+            return_exceptions=True,
+        )
+        for item, outcome in zip(long_items, outcomes):
+            if isinstance(outcome, BaseException):
+                continue
+            graded[item.qid] = outcome[0]
+            tokens_used += outcome[1]
+
+        results.update(graded)
+
+        by_model: dict[str, dict[str, tuple[float, str]]] = {}
+        for item in pending:
+            if item.qid not in graded:
+                continue
+            response = graded[item.qid]
+            model = response.model or engine.model_for(item)
+            key = cls.cache_key(item, engine, model)
+            by_model.setdefault(model, {})[key] = (response.score, response.feedback)
+        for model, values in by_model.items():
+            await evaluation_cache.put_many(model, values)
+        return results, tokens_used
@@ -0,0 +1,41 @@
+import string
+
+from app.utils.cache import normalize_answer
+from app.utils.evaluator import EvaluationItem, EvaluationResponse
+
+BLANK_ANSWER_FEEDBACK = "You have not provided an answer to this question."
+EXACT_MATCH_FEEDBACK = "Your answer is correct."
+
+
+class PreGrader:
+    """
+    Deterministic rules that settle an answer locally, before any LLM call.
+    Returns None when the answer still needs to be evaluated by the LLM.
+    """
+
+    # Exact matching only makes sense for short, factual model answers.
+    max_exact_match_words = 12
+
+    @staticmethod
+    def _canonical(text: str) -> str:
+        return normalize_answer(text).strip(string.punctuation + " ")
+
+    @classmethod
+    def grade(
+        cls, item: EvaluationItem, exact_match: bool = False
+    ) -> EvaluationResponse | None:
+        if not item.student_answer.strip():
+            return EvaluationResponse(score=0.0, feedback=BLANK_ANSWER_FEEDBACK)
+
+        if (
+            exact_match
+            and item.teacher_answer
+            and len(item.teacher_answer.split()) <= cls.max_exact_match_words
+            and cls._canonical(item.student_answer)
+            == cls._canonical(item.teacher_answer)
+        ):
+            return EvaluationResponse(
+                score=item.max_marks, feedback=EXACT_MATCH_FEEDBACK
+            )
+
+        return None
@@ -0,0 +1,119 @@
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+
+class ProgressBroker:
+    """
+    In-process pub/sub of job events. The latest event of recent jobs is kept so a
+    subscriber joining late (or after the job finished) starts from the current state.
+    """
+
+    def __init__(self, retain: int = 1024, queue_size: int = 100):
+        self.retain = retain
+        self.queue_size = queue_size
+        self.latest: OrderedDict[int, tuple[str, dict]] = OrderedDict()
+        self.subscribers: dict[int, set[asyncio.Queue]] = {}
+
+    def publish(self, job_id: int, event: str, data: dict) -> None:
+        self.latest[job_id] = (event, data)
+        self.latest.move_to_end(job_id)
+        while len(self.latest) > self.retain:
+            self.latest.popitem(last=False)
+
+        for queue in self.subscribers.get(job_id, ()):
+            if queue.full():
+                # A slow subscriber only needs the most recent progress.
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def subscribe(self, job_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        if job_id in self.latest:
+            queue.put_nowait(self.latest[job_id])
+        self.subscribers.setdefault(job_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, job_id: int, queue: asyncio.Queue) -> None:
+        queue_set = self.subscribers.get(job_id)
+        if queue_set is None:
+            return
+        queue_set.discard(queue)
+        if not queue_set:
+            del self.subscribers[job_id]
+
+
+progress_broker = ProgressBroker()
+
+
+@dataclass
+class JobProgress:
+    """Running counters of one evaluation job, published on every change."""
+
+    job_id: int
+    broker: ProgressBroker = progress_broker
+    total_submissions: int = 0
+    done_submissions: int = 0
+    failed_submissions: int = 0
+    total_answers: int = 0
+    # Answers counted per submission before it is loaded, corrected once it is
+    expected_answers_per_submission: int = 0
+    done_answers: int = 0
+    failed_answers: int = 0
+    # Answers left pending for a later evaluation when a deadline ran out
+    deferred_answers: int = 0
+    tokens_used: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    def eta_seconds(self) -> float | None:
+        if self.done_answers == 0 or self.total_answers == 0:
+            return None
+        elapsed = time.monotonic() - self.started
+        remaining = max(0, self.total_answers - self.done_answers)
+        return round(elapsed / self.done_answers * remaining, 1)
+
+    def as_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "total_submissions": self.total_submissions,
+            "done_submissions": self.done_submissions,
+            "failed_submissions": self.failed_submissions,
+            "total_answers": self.total_answers,
+            "done_answers": self.done_answers,
+            "failed_answers": self.failed_answers,
+            "deferred_answers": self.deferred_answers,
+            "tokens_used": self.tokens_used,
+            "eta_seconds": self.eta_seconds(),
+        }
+
+    def publish(self) -> None:
+        self.broker.publish(self.job_id, "progress", self.as_dict())
+
+    def answer_done(self, failed: bool) -> None:
+        self.done_answers += 1
+        self.failed_answers += failed
+        self.publish()
+
+    def answers_deferred(self, answers: int) -> None:
+        self.deferred_answers += answers
+        self.publish()
+
+    def submission_started(self, answers: int) -> None:
+        self.total_answers += answers - self.expected_answers_per_submission
+        self.publish()
+
+    def add_tokens(self, tokens: int) -> None:
+        if tokens:
+            self.tokens_used += tokens
+            self.publish()
+
+    def submission_done(self, failed: bool) -> None:
+        self.done_submissions += 1
+        self.failed_submissions += failed
+        self.publish()
+
+    def finish(self, status: str, error: str | None = None) -> None:
+        self.broker.publish(
+            self.job_id, "done", {**self.as_dict(), "status": status, "error": error}
+        )
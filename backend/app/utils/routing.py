@@ -0,0 +1,89 @@
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from app.config import settings
+from app.utils.evaluator import EvaluationItem
+from app.utils.text import estimate_tokens
+
+QuestionType = Literal["short", "descriptive"]
+
+
+class RoutingRule(BaseModel):
+    """Sends answers matching every condition that is set to `model`."""
+
+    model: str
+    max_marks: float | None = None
+    max_answer_tokens: int | None = None
+    has_rubric: bool | None = None
+    question_type: QuestionType | None = None
+
+
+class RoutingRules(BaseModel):
+    """Ordered rules; the first match wins, otherwise `default_model` (or the backend's)."""
+
+    rules: list[RoutingRule] = Field(default_factory=list)
+    default_model: str | None = None
+
+
+class ModelRouter:
+    # Model answers up to this many words are treated as short factual questions.
+    short_answer_words = 12
+
+    @classmethod
+    def question_type(cls, item: EvaluationItem) -> QuestionType:
+        if item.teacher_answer and (
+            len(item.teacher_answer.split()) <= cls.short_answer_words
+        ):
+            return "short"
+        return "descriptive"
+
+    @classmethod
+    def matches(cls, rule: RoutingRule, item: EvaluationItem) -> bool:
+        if rule.max_marks is not None and item.max_marks > rule.max_marks:
+            return False
+        if (
+            rule.max_answer_tokens is not None
+            and estimate_tokens(item.student_answer) > rule.max_answer_tokens
+        ):
+            return False
+        if rule.has_rubric is not None and bool(item.rubric) != rule.has_rubric:
+            return False
+        if (
+            rule.question_type is not None
+            and cls.question_type(item) != rule.question_type
+        ):
+            return False
+        return True
+
+    @staticmethod
+    def default_rules() -> RoutingRules | None:
+        if not settings.LLM_ROUTING_ENABLED:
+            return None
+        return RoutingRules(
+            rules=[
+                RoutingRule(
+                    model=settings.LLM_FAST_MODEL,
+                    max_marks=settings.LLM_FAST_MAX_MARKS,
+                    max_answer_tokens=settings.LLM_FAST_MAX_ANSWER_TOKENS,
+                    has_rubric=False,
+                )
+            ]
+        )
+
+    @classmethod
+    def route(
+        cls, item: EvaluationItem, rules: RoutingRules | None = None
+    ) -> str | None:
+        """
+        Model to grade `item` with, or None to keep the backend's default model.
+        A paper's own rules take precedence over the global ones.
+        """
+        rules = rules or cls.default_rules()
+        if rules is None:
+            return None
+
+        for rule in rules.rules:
+            if cls.matches(rule, item):
+                return rule.model
+        return rules.default_model
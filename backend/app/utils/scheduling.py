@@ -0,0 +1,168 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable
+
+# Who the LLM work started in this context is done for (the teacher's email)
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default="default")
+# Monotonic time by which that work must be done, if it has a budget
+current_deadline: ContextVar[float | None] = ContextVar(
+    "current_deadline", default=None
+)
+# Charged the estimated tokens of completions abandoned mid-flight
+current_usage: ContextVar[Callable[[int], None] | None] = ContextVar(
+    "current_usage", default=None
+)
+
+
+@contextmanager
+def tenant_scope(
+    tenant: str | None,
+    deadline: float | None = None,
+    on_abandoned: Callable[[int], None] | None = None,
+):
+    tokens = (
+        current_tenant.set(tenant or "default"),
+        current_deadline.set(deadline),
+        current_usage.set(on_abandoned),
+    )
+    try:
+        yield
+    finally:
+        current_usage.reset(tokens[2])
+        current_deadline.reset(tokens[1])
+        current_tenant.reset(tokens[0])
+
+
+def time_left() -> float | None:
+    """Seconds until the current deadline, or None without one."""
+    deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def charge_abandoned(tokens: int) -> None:
+    on_abandoned = current_usage.get()
+    if on_abandoned is not None:
+        on_abandoned(tokens)
+
+
+@dataclass
+class TenantQueue:
+    weight: float = 1.0
+    # (cost, sequence, future, enqueued at); the cheapest waiter goes first
+    waiters: list[tuple[float, int, asyncio.Future, float]] = field(
+        default_factory=list
+    )
+    running: int = 0
+    # Weighted cost served so far; the backlogged tenant with the least goes next
+    virtual_time: float = 0.0
+    served: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+
+class FairScheduler:
+    """
+    Grants a fixed number of slots across tenants by weighted fair queuing: each grant
+    advances the tenant's virtual time by cost / weight, and the next slot goes to the
+    waiting tenant that is furthest behind. A tenant returning from idle starts at the
+    current virtual time instead of cashing in credit. Within a tenant the cheapest
+    (shortest) request goes first, and each tenant can be capped at `tenant_cap` slots.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        weights: dict[str, float] | None = None,
+        tenant_cap: int = 0,
+    ):
+        self.capacity = max(1, capacity)
+        self.weights = weights or {}
+        self.tenant_cap = tenant_cap
+        self.in_use = 0
+        self.virtual_clock = 0.0
+        self.tenants: dict[str, TenantQueue] = {}
+        self.sequence = itertools.count()
+
+    def _tenant(self, tenant: str) -> TenantQueue:
+        if tenant not in self.tenants:
+            self.tenants[tenant] = TenantQueue(weight=self.weights.get(tenant, 1.0))
+        return self.tenants[tenant]
+
+    async def acquire(self, tenant: str, cost: float = 1.0) -> None:
+        queue = self._tenant(tenant)
+        if not queue.waiters and queue.running == 0:
+            queue.virtual_time = max(queue.virtual_time, self.virtual_clock)
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (max(cost, 1.0), next(self.sequence), future, time.monotonic())
+        heapq.heappush(queue.waiters, entry)
+        self._dispatch()
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the waiter gave up; hand the slot on.
+                self.release(tenant)
+            elif entry in queue.waiters:
+                queue.waiters.remove(entry)
+                heapq.heapify(queue.waiters)
+            raise
+
+    def release(self, tenant: str) -> None:
+        self.in_use -= 1
+        self.tenants[tenant].running -= 1
+        self._dispatch()
+
+    def _eligible(self, queue: TenantQueue) -> bool:
+        return bool(queue.waiters) and (
+            self.tenant_cap <= 0 or queue.running < self.tenant_cap
+        )
+
+    def _dispatch(self) -> None:
+        while self.in_use < self.capacity:
+            ready = [q for q in self.tenants.values() if self._eligible(q)]
+            if not ready:
+                return
+            queue = min(ready, key=lambda q: q.virtual_time)
+            cost, _, future, enqueued = heapq.heappop(queue.waiters)
+            if future.done():
+                continue
+
+            wait = time.monotonic() - enqueued
+            queue.served += 1
+            queue.total_wait += wait
+            queue.max_wait = max(queue.max_wait, wait)
+            self.virtual_clock = queue.virtual_time
+            queue.virtual_time += cost / queue.weight
+            queue.running += 1
+            self.in_use += 1
+            future.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            "in_use": self.in_use,
+            "capacity": self.capacity,
+            "tenants": {
+                tenant: {
+                    "weight": queue.weight,
+                    "queued": len(queue.waiters),
+                    "running": queue.running,
+                    "served": queue.served,
+                    "avg_wait_ms": (
+                        round(queue.total_wait / queue.served * 1000, 1)
+                        if queue.served
+                        else None
+                    ),
+                    "max_wait_ms": round(queue.max_wait * 1000, 1),
+                }
+                for tenant, queue in self.tenants.items()
+            },
+        }
@@ -0,0 +1,58 @@
+import math
+import re
+from collections import Counter
+
+STOPWORDS = frozenset("""
+    a an and are as at be been but by can could did do does for from had has have
+    how i if in into is it its it's may might more most no not of on or our should
+    so such than that the their them then there these they this those to was we
+    were what when where which while who why will with would you your
+    """.split())
+
+WORD_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    # Local approximation of the llama tokenizer: short words are a single token,
+    # longer words split every few characters and punctuation counts separately.
+    # It errs on the high side, which is what quota reservations need.
+    return max(1, sum(1 + (len(piece) - 1) // 6 for piece in TOKEN_RE.findall(text)))
+
+
+def tokenize(text: str | None) -> list[str]:
+    if not text:
+        return []
+    return [w for w in WORD_RE.findall(text.casefold()) if w not in STOPWORDS]
+
+
+class TfidfVectorizer:
+    """Sparse TF-IDF vectors over a small in-memory corpus."""
+
+    def __init__(self, documents: list[list[str]]):
+        self.document_count = len(documents)
+        self.document_frequency = Counter(
+            term for doc in documents for term in set(doc)
+        )
+
+    def idf(self, term: str) -> float:
+        # Smoothed so terms unseen in the corpus still carry weight.
+        return (
+            math.log((1 + self.document_count) / (1 + self.document_frequency[term]))
+            + 1
+        )
+
+    def transform(self, tokens: list[str]) -> dict[str, float]:
+        counts = Counter(tokens)
+        vector = {term: tf * self.idf(term) for term, tf in counts.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        if norm == 0:
+            return {}
+        return {term: w / norm for term, w in vector.items()}
+
+
+def cosine_similarity(a: dict[str, float], b: dict[str, float]) -> float:
+    # Vectors from TfidfVectorizer.transform are already L2-normalised.
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(w * b.get(term, 0.0) for term, w in a.items())
@@ -0,0 +1,87 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from app.utils.logging import logger
+
+
+class WorkerPool:
+    """
+    A fixed number of background tasks in this process, each repeatedly calling
+    `handler`, which claims and runs one job and returns False when there was none.
+    Idle workers look again every `poll_interval` seconds, or at once on `notify()`.
+    Jobs are claimed from persistent storage by the handler, so nothing is lost when
+    the pool stops.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        handler: Callable[[], Awaitable[bool]],
+        poll_interval: float = 1.0,
+    ):
+        self.size = size
+        self.handler = handler
+        self.poll_interval = poll_interval
+        self.wakeup = asyncio.Event()
+        self.stopping = False
+        self.workers: list[asyncio.Task] = []
+
+        self.busy = 0
+        self.processed = 0
+        self.crashed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self.workers)
+
+    def start(self) -> None:
+        if self.workers:
+            return
+        self.stopping = False
+        self.workers = [
+            asyncio.create_task(self._work()) for _ in range(max(1, self.size))
+        ]
+
+    async def stop(self, drain: bool = False) -> None:
+        """Cancel the workers, or with `drain` let them finish their current job."""
+        self.stopping = True
+        self.wakeup.set()
+        if not drain:
+            for worker in self.workers:
+                worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def notify(self) -> None:
+        self.wakeup.set()
+
+    async def _work(self) -> None:
+        while not self.stopping:
+            self.wakeup.clear()
+            self.busy += 1
+            try:
+                ran = await self.handler()
+            except Exception as exc:
+                self.crashed += 1
+                logger.error("Background job crashed", error=str(exc))
+                ran = False
+            finally:
+                self.busy -= 1
+
+            if ran:
+                self.processed += 1
+            elif not self.stopping:
+                try:
+                    await asyncio.wait_for(
+                        self.wakeup.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.workers),
+            "busy": self.busy,
+            "processed": self.processed,
+            "crashed": self.crashed,
+        }
@@ -0,0 +1,46 @@
+import asyncio
+import signal
+from datetime import timedelta
+
+from app.config import settings
+from app.database import AsyncSessionLocal, engine
+from app.evaluations.ledger import TokenLedger
+from app.evaluations.service import WORKER_ID, job_workers
+from app.utils.evaluator import EvaluationService
+from app.utils.logging import logger
+
+
+async def main() -> None:
+    """
+    Run queued evaluation jobs from the shared database until SIGINT/SIGTERM, letting
+    jobs in progress finish. Start any number of these next to the API with
+    EVALUATION_WORKER_MODE=external:
+
+        python -m app.worker
+    """
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    # Refund token reservations orphaned by a worker that died mid-evaluation
+    async with AsyncSessionLocal() as session:
+        await TokenLedger.release_stale(session, older_than=timedelta(hours=1))
+
+    await EvaluationService.startup()
+    job_workers.start()
+    logger.info(
+        "Evaluation worker started",
+        worker_id=WORKER_ID,
+        concurrency=settings.EVALUATION_WORKERS,
+    )
+    try:
+        await stopping.wait()
+        await job_workers.stop(drain=True)
+    finally:
+        await EvaluationService.shutdown()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
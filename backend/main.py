@@ -1,15 +1,18 @@
 from contextlib import asynccontextmanager
+from datetime import timedelta
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.database import Base, engine
+from app.database import AsyncSessionLocal, Base, engine, upgrade_schema
+from app.utils.evaluator import EvaluationService
 
 from app.auth.route import router as auth_router
 from app.papers.route import router as papers_router
 from app.submissions.route import router as submissions_router
 from app.evaluations.route import router as evaluations_router
+from app.evaluations.service import job_workers
 
 
 @asynccontextmanager
@@ -19,11 +22,28 @@ async def lifespan(app: FastAPI):
         import app.auth.model
         import app.papers.model
         import app.submissions.model
+        import app.evaluations.model
 
         await conn.run_sync(Base.metadata.create_all)
+        await upgrade_schema(conn)
+
+    # Refund token reservations orphaned by a previous process
+    from app.evaluations.ledger import TokenLedger
+
+    async with AsyncSessionLocal() as session:
+        await TokenLedger.release_stale(session, older_than=timedelta(hours=1))
+
+    await EvaluationService.startup()
+    # With external workers (`python -m app.worker`) this process only queues jobs.
+    # Inline workers claim from the same table, so jobs left behind by a previous
+    # process are picked up once queued or their lease lapses.
+    if settings.EVALUATION_WORKER_MODE == "inline":
+        job_workers.start()
     yield
 
     # shutdown
+    await job_workers.stop()
+    await EvaluationService.shutdown()
     await engine.dispose()
 
 
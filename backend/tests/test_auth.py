@@ -3,10 +3,12 @@ import uuid
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import delete
+from sqlalchemy import delete, update
 
 from app.database import AsyncSessionLocal
-from app.auth.model import AppUser, Association
+from app.auth.model import AppUser, Association, UserUsage
+from app.auth.quota import Quota
+from app.core.model import QuotaKind
 from main import app
 
 
@@ -526,3 +528,75 @@ async def test_get_associations_student_view(
         data = response.json()
         assert "associations" in data
         assert teacher_email in data["associations"]
+
+
+async def signup_teacher(email, password):
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test/api"
+    ) as ac:
+        await ac.post(
+            "/auth/signup",
+            json={
+                "email": email,
+                "password": password,
+                "full_name": "Quota Teacher",
+                "user_type": "teacher",
+            },
+        )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_quota_consume_takes_from_the_balance(unique_email, test_password):
+    await signup_teacher(unique_email, test_password)
+
+    async with AsyncSessionLocal() as session:
+        usage = await session.get(UserUsage, unique_email)
+        balance = usage.papers_created_balance_monthly
+        total = usage.total_papers_created
+
+        result = await Quota.consume(session, unique_email, QuotaKind.papers)
+        await session.commit()
+        assert result.allowed
+        assert result.remaining == balance - 1
+
+        await session.refresh(usage)
+        assert usage.papers_created_balance_monthly == balance - 1
+        assert usage.total_papers_created == total + 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_quota_consume_denies_past_the_balance(unique_email, test_password):
+    await signup_teacher(unique_email, test_password)
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(UserUsage)
+            .where(UserUsage.email == unique_email)
+            .values(llm_tokens_balance_monthly=100)
+        )
+        await session.commit()
+
+        result = await Quota.consume(
+            session, unique_email, QuotaKind.llm_tokens, amount=101
+        )
+        await session.commit()
+        assert not result.allowed
+        assert result.remaining == 100
+
+        # The balance is left untouched, and covers a smaller amount.
+        result = await Quota.consume(
+            session, unique_email, QuotaKind.llm_tokens, amount=100
+        )
+        await session.commit()
+        assert result.allowed
+        assert result.remaining == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_quota_consume_allows_users_without_usage_row():
+    async with AsyncSessionLocal() as session:
+        result = await Quota.consume(
+            session, f"unmetered_{uuid.uuid4()}@example.com", QuotaKind.submissions
+        )
+        assert result.allowed
+        assert result.remaining is None
@@ -0,0 +1,783 @@
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException, status
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import select
+
+from app.auth.model import AppUser
+from app.core.model import EvaluationSource, EvaluationStatus
+from app.database import AsyncSessionLocal
+from app.evaluations.service import EvaluationJobService, SubEvaluationService
+from app.submissions.model import Answer, Submission
+from app.utils.evaluator import EvaluationService
+from main import app
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def teacher_credentials_eval():
+    email = f"teacher_eval_{uuid.uuid4()}@example.com"
+    password = "secure_password_123!"
+    yield {
+        "email": email,
+        "password": password,
+        "full_name": "Test Teacher Eval",
+        "user_type": "teacher",
+    }
+    async with AsyncSessionLocal() as session:
+        user = await session.get(AppUser, email)
+        if user:
+            await session.delete(user)
+            await session.commit()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def student_credentials_eval():
+    email = f"student_eval_{uuid.uuid4()}@example.com"
+    password = "secure_password_123!"
+    yield {
+        "email": email,
+        "password": password,
+        "full_name": "Test Student Eval",
+        "user_type": "student",
+    }
+    async with AsyncSessionLocal() as session:
+        user = await session.get(AppUser, email)
+        if user:
+            await session.delete(user)
+            await session.commit()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def teacher_auth_headers_eval(teacher_credentials_eval):
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        await ac.post("/api/auth/signup", json=teacher_credentials_eval)
+        response = await ac.post(
+            "/api/auth/login",
+            data={
+                "username": teacher_credentials_eval["email"],
+                "password": teacher_credentials_eval["password"],
+            },
+        )
+        token = response.json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def student_auth_headers_eval(student_credentials_eval):
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        await ac.post("/api/auth/signup", json=student_credentials_eval)
+        response = await ac.post(
+            "/api/auth/login",
+            data={
+                "username": student_credentials_eval["email"],
+                "password": student_credentials_eval["password"],
+            },
+        )
+        token = response.json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def second_student_eval():
+    credentials = {
+        "email": f"student_eval_{uuid.uuid4()}@example.com",
+        "password": "secure_password_123!",
+        "full_name": "Second Student Eval",
+        "user_type": "student",
+    }
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        await ac.post("/api/auth/signup", json=credentials)
+        response = await ac.post(
+            "/api/auth/login",
+            data={
+                "username": credentials["email"],
+                "password": credentials["password"],
+            },
+        )
+        token = response.json()["access_token"]
+    yield credentials["email"], {"Authorization": f"Bearer {token}"}
+
+    async with AsyncSessionLocal() as session:
+        user = await session.get(AppUser, credentials["email"])
+        if user:
+            await session.delete(user)
+            await session.commit()
+
+
+@pytest_asyncio.fixture(loop_scope="session", scope="function")
+async def submitted_paper(teacher_auth_headers_eval, student_auth_headers_eval):
+    payload = {
+        "title": "Evaluations Test Paper",
+        "start_date": (datetime.now(timezone.utc) - timedelta(days=1)).isoformat(),
+        "duration_minutes": 120,
+        "is_published": True,
+        "questions": [
+            {
+                "question_text": "What is the capital of France?",
+                "model_answer": "Paris",
+                "rubric": "1 mark for Paris",
+                "marks_assigned": 1.0,
+                "sort_order": 1,
+            },
+            {
+                "question_text": "Why do leaves look green?",
+                "model_answer": "Chlorophyll reflects green light.",
+                "rubric": "2 marks for chlorophyll reflecting green light",
+                "marks_assigned": 2.0,
+                "sort_order": 2,
+            },
+        ],
+    }
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            "/api/papers/",
+            json=payload,
+            headers=teacher_auth_headers_eval,
+        )
+        paper_data = response.json()
+        questions = paper_data["questions"]
+        await ac.post(
+            f"/api/submissions/{paper_data['qpid']}",
+            json={
+                "answers": [
+                    {"qid": questions[0]["qid"], "student_answer": "Paris"},
+                    {
+                        "qid": questions[1]["qid"],
+                        "student_answer": "Because chlorophyll reflects green light.",
+                    },
+                ]
+            },
+            headers=student_auth_headers_eval,
+        )
+        yield paper_data
+
+        # Clean up (the paper's submissions and jobs go with it)
+        await ac.delete(
+            f"/api/papers/{paper_data['qpid']}",
+            headers=teacher_auth_headers_eval,
+        )
+
+
+async def run_job(job_id: int) -> None:
+    """Claim and run one queued job, as a worker would."""
+    async with AsyncSessionLocal() as db:
+        job = await EvaluationJobService._claim(db, job_id=job_id)
+        assert job is not None
+        await EvaluationJobService._run_claimed(job, db)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_evaluate_submission_is_queued_and_reported_by_the_job(
+    teacher_auth_headers_eval,
+    student_auth_headers_eval,
+    student_credentials_eval,
+    submitted_paper,
+):
+    qpid = submitted_paper["qpid"]
+    s_email = student_credentials_eval["email"]
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            f"/api/evaluations/{qpid}/{s_email}",
+            params={"backend": "heuristic"},
+            headers=teacher_auth_headers_eval,
+        )
+        assert response.status_code == 202
+        job = response.json()
+        assert job["status"] == "queued"
+        assert job["s_email"] == s_email
+
+        response = await ac.get(
+            f"/api/evaluations/jobs/{job['id']}",
+            headers=teacher_auth_headers_eval,
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "queued"
+
+        # Only the teacher who queued it can see the job
+        response = await ac.get(
+            f"/api/evaluations/jobs/{job['id']}",
+            headers=student_auth_headers_eval,
+        )
+        assert response.status_code == 403
+
+        await run_job(job["id"])
+
+        response = await ac.get(
+            f"/api/evaluations/jobs/{job['id']}",
+            headers=teacher_auth_headers_eval,
+        )
+        data = response.json()
+        assert data["status"] == "succeeded"
+        assert data["error"] is None
+        assert data["result"]["evaluated"] == True
+        assert len(data["result"]["answers"]) == 2
+        assert data["finished_at"] is not None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_evaluate_missing_submission_is_not_queued(
+    teacher_auth_headers_eval, submitted_paper
+):
+    qpid = submitted_paper["qpid"]
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            f"/api/evaluations/{qpid}/nobody@example.com",
+            headers=teacher_auth_headers_eval,
+        )
+        assert response.status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_repeated_evaluation_request_returns_the_queued_job(
+    teacher_auth_headers_eval, student_credentials_eval, submitted_paper
+):
+    qpid = submitted_paper["qpid"]
+    s_email = student_credentials_eval["email"]
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        single = [
+            await ac.post(
+                f"/api/evaluations/{qpid}/{s_email}",
+                params={"backend": "heuristic"},
+                headers=teacher_auth_headers_eval,
+            )
+            for _ in range(2)
+        ]
+        bulk = [
+            await ac.post(
+                f"/api/evaluations/{qpid}",
+                params={"backend": "heuristic"},
+                headers=teacher_auth_headers_eval,
+            )
+            for _ in range(2)
+        ]
+        assert single[0].json()["id"] == single[1].json()["id"]
+        assert bulk[0].json()["id"] == bulk[1].json()["id"]
+        assert single[0].json()["id"] != bulk[0].json()["id"]
+
+        # Once the job has finished, the next request queues a new one.
+        await run_job(single[0].json()["id"])
+        response = await ac.post(
+            f"/api/evaluations/{qpid}/{s_email}",
+            params={"backend": "heuristic"},
+            headers=teacher_auth_headers_eval,
+        )
+        assert response.json()["id"] != single[0].json()["id"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_job_with_deferred_answers_queues_a_follow_up(
+    monkeypatch, teacher_auth_headers_eval, student_credentials_eval, submitted_paper
+):
+    qpid = submitted_paper["qpid"]
+    s_email = student_credentials_eval["email"]
+
+    async def out_of_time(job, db, progress):
+        progress.answer_done(failed=False)
+        progress.answers_deferred(1)
+        return {"s_email": job.s_email}, None
+
+    monkeypatch.setattr(EvaluationJobService, "_execute", out_of_time)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            f"/api/evaluations/{qpid}/{s_email}",
+            headers=teacher_auth_headers_eval,
+        )
+        job_id = response.json()["id"]
+        await run_job(job_id)
+
+        response = await ac.get(
+            f"/api/evaluations/jobs/{job_id}", headers=teacher_auth_headers_eval
+        )
+        data = response.json()
+        assert data["status"] == "succeeded"
+        deferred = data["result"]["deferred"]
+        assert deferred["answers"] == 1
+
+        response = await ac.get(
+            f"/api/evaluations/jobs/{deferred['follow_up_job_id']}",
+            headers=teacher_auth_headers_eval,
+        )
+        assert response.json()["status"] == "queued"
+        assert response.json()["s_email"] == s_email
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_evaluation_grades_every_pending_submission(
+    teacher_auth_headers_eval, student_credentials_eval, submitted_paper
+):
+    qpid = submitted_paper["qpid"]
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            f"/api/evaluations/{qpid}",
+            params={"backend": "heuristic"},
+            headers=teacher_auth_headers_eval,
+        )
+        assert response.status_code == 202
+        job = response.json()
+        assert job["s_email"] is None
+
+        await run_job(job["id"])
+
+        response = await ac.get(
+            f"/api/evaluations/jobs/{job['id']}",
+            headers=teacher_auth_headers_eval,
+        )
+        data = response.json()
+        assert data["status"] == "succeeded"
+        assert data["total_items"] == 1
+        assert data["completed_items"] == 1 and data["failed_items"] == 0
+        outcome = data["result"]["submissions"][0]
+        assert outcome["s_email"] == student_credentials_eval["email"]
+        assert outcome["error"] is None
+
+        # Nothing is left to grade, so a second run has no submissions.
+        response = await ac.post(
+            f"/api/evaluations/{qpid}",
+            params={"backend": "heuristic"},
+            headers=teacher_auth_headers_eval,
+        )
+        await run_job(response.json()["id"])
+        response = await ac.get(
+            f"/api/evaluations/jobs/{response.json()['id']}",
+            headers=teacher_auth_headers_eval,
+        )
+        assert response.json()["total_items"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_inheritance_keeps_a_failed_submission_unevaluated(
+    teacher_auth_headers_eval,
+    student_credentials_eval,
+    second_student_eval,
+    submitted_paper,
+    monkeypatch,
+):
+    qpid = submitted_paper["qpid"]
+    questions = submitted_paper["questions"]
+    second_email, second_headers = second_student_eval
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        # The same answer to the first question as the other student, so the two
+        # are clustered and one of them inherits the other's grade.
+        await ac.post(
+            f"/api/submissions/{qpid}",
+            json={
+                "answers": [
+                    {"qid": questions[0]["qid"], "student_answer": "Paris"},
+                    {
+                        "qid": questions[1]["qid"],
+                        "student_answer": "No idea, the sun paints them maybe.",
+                    },
+                ]
+            },
+            headers=second_headers,
+        )
+
+        # The inheriting student's own evaluation is refused.
+        evaluate_submission = SubEvaluationService.evaluate_submission
+
+        async def refuse_inheriting(*args, inherited=None, **kwargs):
+            if inherited:
+                raise HTTPException(
+                    status_code=status.HTTP_402_PAYMENT_REQUIRED,
+                    detail="Out of tokens.",
+                )
+            return await evaluate_submission(*args, inherited=inherited, **kwargs)
+
+        monkeypatch.setattr(
+            SubEvaluationService, "evaluate_submission", refuse_inheriting
+        )
+
+        response = await ac.post(
+            f"/api/evaluations/{qpid}",
+            params={"backend": "heuristic"},
+            headers=teacher_auth_headers_eval,
+        )
+        job_id = response.json()["id"]
+        await run_job(job_id)
+
+        response = await ac.get(
+            f"/api/evaluations/jobs/{job_id}",
+            headers=teacher_auth_headers_eval,
+        )
+        data = response.json()
+        assert data["completed_items"] == 1 and data["failed_items"] == 1
+        assert data["result"]["inherited"] == 1
+
+    async with AsyncSessionLocal() as session:
+        s_res = await session.execute(
+            select(Submission.s_email, Submission.evaluated).where(
+                Submission.qpid == qpid
+            )
+        )
+        evaluated = dict(s_res.all())
+
+    failed = next(
+        outcome["s_email"]
+        for outcome in data["result"]["submissions"]
+        if outcome["error"] is not None
+    )
+    assert failed in (student_credentials_eval["email"], second_email)
+    # Its inherited answer is graded, but its own answer never was.
+    assert evaluated[failed] == False
+    assert sum(evaluated.values()) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_graded_answers_and_totals_are_persisted(
+    teacher_auth_headers_eval, student_credentials_eval, submitted_paper
+):
+    qpid = submitted_paper["qpid"]
+    s_email = student_credentials_eval["email"]
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        response = await ac.post(
+            f"/api/evaluations/{qpid}/{s_email}",
+            params={"backend": "heuristic"},
+            headers=teacher_auth_headers_eval,
+        )
+        await run_job(response.json()["id"])
+
+    async with AsyncSessionLocal() as session:
+        a_res = await session.execute(
+            select(Answer).where(Answer.qpid == qpid, Answer.s_email == s_email)
+        )
+        answers = a_res.scalars().all()
+        submission = await session.get(Submission, (qpid, s_email))
+
+    assert len(answers) == 2
+    for a in answers:
+        assert a.status == EvaluationStatus.success
+        assert a.evaluation_source == EvaluationSource.heuristic
+        assert a.grading_fingerprint is not None
+    assert submission.evaluated
+    assert submission.total_marks_obtained == sum(a.marks_obtained for a in answers)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_concurrent_workers_claim_different_jobs(
+    teacher_auth_headers_eval, student_credentials_eval, submitted_paper
+):
+    qpid = submitted_paper["qpid"]
+    s_email = student_credentials_eval["email"]
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as ac:
+        job_ids = set()
+        for _ in range(2):
+            response = await ac.post(
+                f"/api/evaluations/{qpid}/{s_email}",
+                params={"backend": "heuristic"},
+                headers=teacher_auth_headers_eval,
+            )
+            job_ids.add(response.json()["id"])
+
+    # Both workers look for the oldest job at once; SKIP LOCKED makes the second one
+    # pass over the row the first is claiming instead of waiting for it.
+    async with AsyncSessionLocal() as db_a, AsyncSessionLocal() as db_b:
+        claims = await asyncio.gather(
+            EvaluationJobService._claim(db_a), EvaluationJobService._claim(db_b)
+        )
+    assert all(claim is not None for claim in claims)
+    assert {claim.id for claim in claims} == job_ids
+    assert claims[0].claim != claims[1].claim
+
+    # A claimed job is not handed out again while its lease holds.
+    async with AsyncSessionLocal() as db:
+        assert await EvaluationJobService._claim(db, job_id=claims[0].id) is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_worker_pool_claims_queued_jobs_and_survives_crashes():
+    from app.utils.workers import WorkerPool
+
+    queued = [1, 2, 3, 4, 5]
+    handled = []
+
+    async def claim_and_run() -> bool:
+        if not queued:
+            return False
+        job_id = queued.pop(0)
+        if job_id == 2:
+            raise RuntimeError("boom")
+        await asyncio.sleep(0.01)
+        handled.append(job_id)
+        return True
+
+    pool = WorkerPool(size=2, handler=claim_and_run, poll_interval=10)
+    pool.start()
+    await asyncio.sleep(0.1)
+    assert sorted(handled) == [1, 3, 4, 5]
+
+    # An idle pool picks up new work as soon as it is notified.
+    queued.append(6)
+    pool.notify()
+    await asyncio.sleep(0.05)
+    await pool.stop()
+
+    assert sorted(handled) == [1, 3, 4, 5, 6]
+    assert pool.stats()["processed"] == 5 and pool.stats()["crashed"] == 1
+    assert not pool.running
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_progress_broker_replays_latest_event_to_late_subscribers():
+    from app.utils.progress import JobProgress, ProgressBroker
+
+    broker = ProgressBroker(queue_size=2)
+    progress = JobProgress(job_id=7, broker=broker, total_answers=4)
+
+    early = broker.subscribe(7)
+    progress.answer_done(failed=False)
+    progress.add_tokens(120)
+    progress.answer_done(failed=True)  # the full queue drops its oldest event
+
+    late = broker.subscribe(7)
+    event, data = late.get_nowait()
+    assert event == "progress"
+    assert data["done_answers"] == 2 and data["failed_answers"] == 1
+    assert data["tokens_used"] == 120 and data["eta_seconds"] is not None
+    assert early.qsize() == 2
+
+    progress.finish("succeeded")
+    assert late.get_nowait()[0] == "done"
+    broker.unsubscribe(7, early)
+    broker.unsubscribe(7, late)
+    assert 7 not in broker.subscribers
+
+
+def test_only_answers_with_changed_inputs_need_regrading():
+    from decimal import Decimal
+
+    from app.core.model import EvaluationStatus
+    from app.evaluations.service import grading_fingerprint, needs_grading
+    from app.papers.model import Question
+    from app.submissions.model import Answer
+
+    question = Question(
+        qid=1,
+        question_text="Define osmosis.",
+        model_answer="Movement of water across a membrane.",
+        rubric=None,
+        marks_assigned=Decimal("5.00"),
+        auto_grade_exact_match=False,
+    )
+    answer = Answer(qid=1, student_answer="Water moves through a membrane.")
+    answer.status = EvaluationStatus.pending
+    assert needs_grading(answer, question)
+
+    # Graded before fingerprints were recorded
+    answer.status = EvaluationStatus.success
+    assert not needs_grading(answer, question)
+
+    answer.grading_fingerprint = grading_fingerprint(answer, question)
+    assert not needs_grading(answer, question)
+
+    question.rubric = "Award full marks for mentioning a semi-permeable membrane."
+    assert needs_grading(answer, question)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_graded_answers_are_checkpointed_in_batches(monkeypatch):
+    from decimal import Decimal
+
+    from app.config import settings
+    from app.core.model import EvaluationStatus
+    from app.evaluations import service
+    from app.papers.model import Question
+    from app.submissions.model import Answer
+
+    commits: list[str] = []
+
+    class RecordingSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def execute(self, stmt):
+            commits.append(str(stmt))
+
+        async def commit(self):
+            pass
+
+    monkeypatch.setattr(service, "AsyncSessionLocal", RecordingSession)
+    monkeypatch.setattr(settings, "EVALUATION_CHECKPOINT_BATCH", 2)
+    monkeypatch.setattr(settings, "EVALUATION_CHECKPOINT_INTERVAL", 60.0)
+
+    question = Question(qid=1, question_text="Q", marks_assigned=Decimal("2.00"))
+    answers = [
+        Answer(qpid=1, s_email="s@x.com", qid=1, student_answer=f"answer {i}")
+        for i in range(3)
+    ]
+    run = service.EvaluationRun(
+        submissions=[],
+        answers=answers,
+        questions_map={1: question},
+        engine=EvaluationService.get_backend("heuristic"),
+    )
+    for i, a in enumerate(answers):
+        a.status = EvaluationStatus.failed if i == 1 else EvaluationStatus.success
+        run.answer_done(a)
+        await service.SubEvaluationService._checkpoint(run)
+
+    # Only the two successful answers are written, together in one statement.
+    assert len(commits) == 1 and "UPDATE answers" in commits[0]
+    assert run.unsaved == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_answers_past_the_deadline_are_deferred():
+    from app.core.model import EvaluationStatus
+    from app.evaluations import service
+    from app.submissions.model import Answer
+    from app.utils.progress import JobProgress, ProgressBroker
+
+    answers = [
+        Answer(qpid=1, s_email="s@x.com", qid=qid, student_answer="answer")
+        for qid in (1, 2)
+    ]
+    run = service.EvaluationRun(
+        submissions=[],
+        answers=answers,
+        questions_map={},
+        engine=EvaluationService.get_backend("heuristic"),
+        llm_answers=answers,
+        deadline=time.monotonic() + 0.05,
+        progress=JobProgress(job_id=0, broker=ProgressBroker()),
+    )
+
+    async def grade(ans: Answer, delay: float) -> None:
+        await asyncio.sleep(delay)
+        ans.status = EvaluationStatus.success
+        run.answer_done(ans)
+
+    started = time.monotonic()
+    await service.SubEvaluationService._run_until_deadline(
+        run, [grade(answers[0], 0), grade(answers[1], 10)]
+    )
+
+    assert time.monotonic() - started < 1
+    assert answers[0].status == EvaluationStatus.success
+    assert answers[1].status == EvaluationStatus.pending
+    assert run.deferred == [answers[1]]
+    assert run.progress.deferred_answers == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_job_that_loses_its_lease_is_cancelled_without_writing(monkeypatch):
+    from app.evaluations.service import ClaimedJob, EvaluationJobService
+
+    cancelled = asyncio.Event()
+
+    async def slow_execute(job, db, progress):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def lapsed_lease(job, on_lost):
+        await asyncio.sleep(0.01)
+        on_lost()
+
+    class UntouchedSession:
+        async def execute(self, stmt):
+            raise AssertionError("a reclaimed job must not be written")
+
+    monkeypatch.setattr(EvaluationJobService, "_execute", slow_execute)
+    monkeypatch.setattr(EvaluationJobService, "_renew_lease", lapsed_lease)
+
+    job = ClaimedJob(1, 1, "s@x.com", "t@x.com", None, claim="host:1:abc")
+    await asyncio.wait_for(
+        EvaluationJobService._run_claimed(job, UntouchedSession()), timeout=1
+    )
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_job_cancelled_by_shutdown_goes_back_to_the_queue(monkeypatch):
+    from app.evaluations.service import ClaimedJob, EvaluationJobService
+
+    requeued = []
+
+    async def slow_execute(job, db, progress):
+        await asyncio.sleep(10)
+
+    async def healthy_lease(job, on_lost):
+        await asyncio.sleep(10)
+
+    async def requeue(job):
+        requeued.append(job.id)
+
+    monkeypatch.setattr(EvaluationJobService, "_execute", slow_execute)
+    monkeypatch.setattr(EvaluationJobService, "_renew_lease", healthy_lease)
+    monkeypatch.setattr(EvaluationJobService, "_requeue", requeue)
+
+    job = ClaimedJob(3, 1, "s@x.com", "t@x.com", None, claim="host:1:abc")
+    task = asyncio.create_task(EvaluationJobService._run_claimed(job, None))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert requeued == [3]
+
+
+def test_job_row_progress_for_jobs_running_elsewhere():
+    from datetime import datetime, timedelta, timezone
+
+    from app.core.model import JobStatus
+    from app.evaluations.schemas import EvaluationJobOut
+    from app.evaluations.service import EvaluationJobService, SubEvaluationService
+
+    now = datetime.now(timezone.utc)
+    job = EvaluationJobOut(
+        id=4,
+        qpid=1,
+        status=JobStatus.running,
+        total_items=10,
+        completed_items=3,
+        failed_items=1,
+        created_at=now - timedelta(seconds=40),
+        started_at=now - timedelta(seconds=40),
+    )
+    progress = EvaluationJobService._row_progress(job)
+
+    assert progress["total_submissions"] == 10
+    assert progress["done_submissions"] == 4
+    assert progress["failed_submissions"] == 1
+    assert 55 <= progress["eta_seconds"] <= 65
@@ -1,9 +1,30 @@
+import asyncio
 import time
+import uuid
 
+import httpx
 import pytest
+from groq import APIStatusError, InternalServerError, RateLimitError
 
-from app.utils.evaluator import EvaluationService, EvaluationResponse
+from app.utils.evaluator import (
+    CircuitBreaker,
+    CircuitOpenError,
+    EvaluationItem,
+    EvaluationResponse,
+    EvaluationService,
+    Hedger,
+    LLMDispatcher,
+    MicroBatcher,
+    RateLimiter,
+    compactor,
+    parse_partial_evaluation,
+)
+from app.utils.cache import EvaluationCache, evaluation_cache
+from app.utils.compaction import AnswerCompactor
 from app.utils.logging import logger
+from app.utils.pregrader import PreGrader
+from app.utils.scheduling import current_tenant, tenant_scope
+from app.utils.text import estimate_tokens
 
 
 @pytest.mark.asyncio
@@ -158,3 +179,683 @@ async def test_evaluate_custom_max_marks():
         score=result.score,
         feedback=result.feedback,
     )
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_dispatcher_caps_concurrency():
+    dispatcher = LLMDispatcher(
+        max_concurrency=2, requests_per_minute=0, tokens_per_minute=0
+    )
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        peak = max(peak, dispatcher.in_flight)
+        await asyncio.sleep(0.01)
+        return "ok", 10
+
+    results = await asyncio.gather(
+        *[dispatcher.run(call, estimated_tokens=10) for _ in range(6)]
+    )
+
+    assert results == [("ok", 10)] * 6
+    assert peak == 2
+    assert dispatcher.stats()["completed"] == 6
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_rate_limiter_waits_for_refill():
+    limiter = RateLimiter(limit_per_minute=600)  # 10 units per second
+    await limiter.acquire(600)
+
+    start_time = time.monotonic()
+    await limiter.acquire(2)
+    waited = time.monotonic() - start_time
+
+    assert waited >= 0.15
+
+    limiter.adjust(600)
+    start_time = time.monotonic()
+    await limiter.acquire(5)
+    assert time.monotonic() - start_time < 0.05
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_evaluate_batch_falls_back_for_missing_items(monkeypatch):
+    async def fake_complete_batch(messages, max_tokens, model):
+        # qid 2 is malformed and qid 3 is missing entirely
+        return [
+            {"qid": 1, "score": 12, "feedback": "Good."},
+            {"qid": 2, "score": "n/a"},
+        ], 100
+
+    fallback_qids = []
+
+    async def fake_evaluate_single(item):
+        fallback_qids.append(item.question)
+        return EvaluationResponse(score=1.0, feedback="Retried."), 40
+
+    groq_backend = EvaluationService.get_backend("groq")
+    monkeypatch.setattr(groq_backend, "_complete_batch", fake_complete_batch)
+    monkeypatch.setattr(groq_backend, "evaluate", fake_evaluate_single)
+    monkeypatch.setattr(evaluation_cache, "persistent", False)
+    # Not the shared dispatcher, whose breaker other tests may have opened.
+    monkeypatch.setattr(
+        "app.utils.evaluator.dispatcher",
+        LLMDispatcher(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0),
+    )
+
+    items = [
+        EvaluationItem(
+            qid=qid, question=f"batch-{uuid.uuid4()}", student_answer="a", max_marks=5
+        )
+        for qid in (1, 2, 3)
+    ]
+    results, tokens = await EvaluationService.evaluate_batch(items, backend="groq")
+
+    assert results[1].score == 5.0  # clamped to max marks
+    assert results[2].feedback == "Retried."
+    assert results[3].feedback == "Retried."
+    assert len(fallback_qids) == 2
+    assert tokens == 180
+
+    # Everything graded above is now served from the cache for free.
+    cached_results, cached_tokens = await EvaluationService.evaluate_batch(
+        items, backend="groq"
+    )
+    assert cached_results == results
+    assert cached_tokens == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_failed_batch_completion_keeps_cached_results(monkeypatch):
+    async def failing_complete_batch(messages, max_tokens, model):
+        raise RuntimeError("provider down")
+
+    groq_backend = EvaluationService.get_backend("groq")
+    monkeypatch.setattr(groq_backend, "_complete_batch", failing_complete_batch)
+    monkeypatch.setattr(evaluation_cache, "persistent", False)
+    monkeypatch.setattr(
+        "app.utils.evaluator.dispatcher",
+        LLMDispatcher(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0),
+    )
+
+    items = [
+        EvaluationItem(
+            qid=qid, question=f"batch-{uuid.uuid4()}", student_answer="a", max_marks=5
+        )
+        for qid in (1, 2)
+    ]
+    await EvaluationService.remember(
+        groq_backend, items[0], EvaluationResponse(score=3.0, feedback="Cached.")
+    )
+
+    results, tokens = await EvaluationService.evaluate_batch(items, backend="groq")
+
+    assert results == {1: EvaluationResponse(score=3.0, feedback="Cached.")}
+    assert tokens == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_evaluation_cache_normalizes_answers_and_evicts():
+    cache = EvaluationCache(max_size=2, persistent=False)
+    key = EvaluationCache.make_key("m", "1", "Q?", "A", None, 5, "  Paris\n ")
+
+    assert key == EvaluationCache.make_key("m", "1", "Q?", "A", None, 5.0, "paris")
+    assert key != EvaluationCache.make_key("m", "2", "Q?", "A", None, 5, "paris")
+
+    await cache.put_many("m", {key: (5.0, "Correct."), "b": (1.0, ""), "c": (0, "")})
+
+    assert await cache.get_many([key, "c"]) == {"c": (0, "")}
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_pregrader_settles_blank_and_exact_match_answers():
+    item = EvaluationItem(
+        qid=1,
+        question="What is the capital of France?",
+        student_answer="  paris. ",
+        max_marks=2,
+        teacher_answer="Paris",
+    )
+
+    blank = PreGrader.grade(item.model_copy(update={"student_answer": " \n"}))
+    assert blank is not None and blank.score == 0.0
+
+    assert PreGrader.grade(item) is None  # exact matching is opt-in per question
+    assert PreGrader.grade(item, exact_match=True).score == 2.0
+    assert (
+        PreGrader.grade(
+            item.model_copy(update={"student_answer": "Lyon"}), exact_match=True
+        )
+        is None
+    )
+
+
+def _status_error(status_code: int, headers: dict | None = None) -> APIStatusError:
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers, request=request)
+    error_cls = RateLimitError if status_code == 429 else InternalServerError
+    return error_cls("error", response=response, body=None)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_dispatcher_retries_transient_errors_honoring_retry_after():
+    dispatcher = LLMDispatcher(
+        max_concurrency=1,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        max_retries=2,
+        retry_base_delay=0.001,
+    )
+    errors = [_status_error(429, {"retry-after-ms": "50"}), _status_error(503)]
+
+    async def call():
+        if errors:
+            raise errors.pop(0)
+        return "ok", 1
+
+    start_time = time.monotonic()
+    assert await dispatcher.run(call, estimated_tokens=1) == ("ok", 1)
+    assert time.monotonic() - start_time >= 0.05
+    assert dispatcher.stats()["retried"] == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_circuit_breaker_fails_fast_while_provider_is_down():
+    dispatcher = LLMDispatcher(
+        max_concurrency=1,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        circuit_breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.05),
+    )
+    calls = 0
+
+    async def failing_call():
+        nonlocal calls
+        calls += 1
+        raise _status_error(500)
+
+    for _ in range(2):
+        with pytest.raises(InternalServerError):
+            await dispatcher.run(failing_call, estimated_tokens=1)
+
+    with pytest.raises(CircuitOpenError):
+        await dispatcher.run(failing_call, estimated_tokens=1)
+    assert calls == 2
+
+    async def healthy_call():
+        return "ok", 1
+
+    await asyncio.sleep(0.06)
+    assert await dispatcher.run(healthy_call, estimated_tokens=1) == ("ok", 1)
+    assert dispatcher.circuit_breaker.state == "closed"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cancelled_trial_call_does_not_wedge_the_circuit_breaker():
+    dispatcher = LLMDispatcher(
+        max_concurrency=2,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        circuit_breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.02),
+    )
+
+    async def failing_call():
+        raise _status_error(500)
+
+    async def hanging_call():
+        await asyncio.sleep(10)
+        return "late", 1
+
+    async def healthy_call():
+        return "ok", 1
+
+    with pytest.raises(InternalServerError):
+        await dispatcher.run(failing_call, estimated_tokens=1)
+    await asyncio.sleep(0.03)
+
+    trial = asyncio.create_task(dispatcher.run(hanging_call, estimated_tokens=1))
+    await asyncio.sleep(0.01)
+    assert dispatcher.circuit_breaker.trial_in_flight
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert await dispatcher.run(healthy_call, estimated_tokens=1) == ("ok", 1)
+    assert dispatcher.circuit_breaker.state == "closed"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_dispatcher_gives_up_when_retry_after_exceeds_the_max_delay():
+    dispatcher = LLMDispatcher(
+        max_concurrency=1,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        max_retries=3,
+        retry_max_delay=1.0,
+    )
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        raise _status_error(429, {"retry-after": "60"})
+
+    with pytest.raises(RateLimitError):
+        await dispatcher.run(call, estimated_tokens=1)
+    assert calls == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_heuristic_backend_ranks_answers_offline():
+    def item(qid: int, answer: str) -> EvaluationItem:
+        return EvaluationItem(
+            qid=qid,
+            question="Name two primary differences between plant and animal cells.",
+            student_answer=answer,
+            max_marks=10.0,
+            teacher_answer="Plant cells have a cell wall and chloroplasts, animal cells do not.",
+        )
+
+    results, tokens = await EvaluationService.evaluate_batch(
+        [
+            item(1, "Plant cells have a cell wall and chloroplasts."),
+            item(2, "Plant cells have a cell wall."),
+            item(3, "The mitochondria is the powerhouse."),
+        ],
+        backend="heuristic",
+    )
+
+    assert tokens == 0
+    assert results[1].score > results[2].score > results[3].score
+    assert all(0.0 <= r.score <= 10.0 and r.feedback for r in results.values())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_micro_batcher_packs_concurrent_requests(monkeypatch):
+    groq_backend = EvaluationService.get_backend("groq")
+    batch_sizes = []
+
+    async def fake_evaluate_batch(items):
+        batch_sizes.append(len(items))
+        return {
+            item.qid: EvaluationResponse(score=len(item.student_answer), feedback="")
+            for item in items
+        }, 90
+
+    async def fake_evaluate(item):
+        return EvaluationResponse(score=0.0, feedback="alone"), 30
+
+    monkeypatch.setattr(groq_backend, "evaluate_batch", fake_evaluate_batch)
+    monkeypatch.setattr(groq_backend, "evaluate", fake_evaluate)
+    batcher = MicroBatcher(window=0.05, max_size=3)
+
+    # Two submissions answering the same question (same qid) in the same window.
+    items = [
+        EvaluationItem(qid=1, question="q", student_answer="a" * n, max_marks=10)
+        for n in (1, 2, 3, 4)
+    ]
+    outcomes = await asyncio.gather(
+        *[batcher.submit(groq_backend, item) for item in items]
+    )
+
+    assert batch_sizes == [3]  # the fourth answer ran alone after the window
+    assert [response.score for response, _ in outcomes[:3]] == [1.0, 2.0, 3.0]
+    assert sum(tokens for _, tokens in outcomes[:3]) == 90
+    assert outcomes[3] == (EvaluationResponse(score=0.0, feedback="alone"), 30)
+    assert batcher.stats()["batched_items"] == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_micro_batcher_keeps_each_callers_context(monkeypatch):
+    monkeypatch.setattr(evaluation_cache, "persistent", False)
+    groq_backend = EvaluationService.get_backend("groq")
+    seen = []
+
+    async def fake_evaluate_batch(items):
+        seen.append((current_tenant.get(), len(items)))
+        await asyncio.sleep(0.05)
+        return {
+            item.qid: EvaluationResponse(score=1.0, feedback=item.student_answer)
+            for item in items
+        }, 100
+
+    monkeypatch.setattr(groq_backend, "evaluate_batch", fake_evaluate_batch)
+    batcher = MicroBatcher(window=0.02, max_size=10)
+    items = [
+        EvaluationItem(
+            qid=1, question="q", student_answer=f"{uuid.uuid4()}", max_marks=10
+        )
+        for _ in range(4)
+    ]
+    charged = {"a": [], "b": []}
+
+    async def grade(tenant: str, item: EvaluationItem):
+        with tenant_scope(tenant, on_abandoned=charged[tenant].append):
+            return await batcher.submit(groq_backend, item)
+
+    tasks = [
+        asyncio.create_task(grade(tenant, item)) for tenant, item in zip("aabb", items)
+    ]
+    await asyncio.sleep(0.04)  # both batches are in flight
+    tasks[0].cancel()
+    outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+
+    # One batch per tenant, each scheduled for its own tenant.
+    assert sorted(seen) == [("a", 2), ("b", 2)]
+    assert isinstance(outcomes[0], asyncio.CancelledError)
+    assert [tokens for _, tokens in outcomes[1:]] == [50, 50, 50]
+    # The cancelled caller is billed its share and its result is kept.
+    assert charged == {"a": [50], "b": []}
+    key = EvaluationService.cache_key(items[0], groq_backend)
+    assert key in await evaluation_cache.get_many([key])
+
+
+def test_batched_estimate_is_cheaper_than_per_answer_estimate():
+    items = [
+        EvaluationItem(
+            qid=qid, question="What is 2 + 2?", student_answer="4", max_marks=1
+        )
+        for qid in range(5)
+    ]
+    per_answer = EvaluationService.get_backend("groq").estimate(items)
+    batched = EvaluationService.get_backend("groq").estimate(items, batched=True)
+
+    assert per_answer > batched > 5 * 256 - 1  # the completion budget is reserved
+    assert EvaluationService.get_backend("heuristic").estimate(items) == 0
+
+
+def test_compactor_dedupes_paragraphs_and_chunks_within_budget():
+    compactor = AnswerCompactor(token_budget=40)
+    paragraph = "Photosynthesis converts light energy into chemical energy."
+    text = f"  {paragraph}  \n\n{paragraph}\n\n\n" + " ".join(
+        f"Sentence number {n} adds more detail." for n in range(20)
+    )
+
+    compacted = compactor.compact(text)
+    assert compacted.count(paragraph) == 1
+    assert "  " not in compacted
+
+    chunks = compactor.chunk(compacted)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(chunk) <= 40 for chunk in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(compacted.split())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_long_answers_are_scored_in_parts(monkeypatch):
+    groq_backend = EvaluationService.get_backend("groq")
+    graded_parts = []
+
+    async def fake_evaluate(item):
+        graded_parts.append(item)
+        # Each part earns 60% of the marks it is worth
+        return (
+            EvaluationResponse(score=item.max_marks * 0.6, feedback="Partly right."),
+            100,
+        )
+
+    monkeypatch.setattr(groq_backend, "evaluate", fake_evaluate)
+    monkeypatch.setattr(evaluation_cache, "persistent", False)
+    monkeypatch.setattr(compactor, "token_budget", 30)
+
+    result, tokens = await EvaluationService.evaluate(
+        question=f"Essay {uuid.uuid4()}",
+        student_answer=" ".join(f"Point {n} is explained here." for n in range(12)),
+        max_marks=5.0,
+        backend="groq",
+    )
+
+    assert len(graded_parts) > 1
+    assert sum(part.max_marks for part in graded_parts) == pytest.approx(5.0)
+    assert result.score == pytest.approx(3.0, abs=0.01)
+    assert result.feedback.startswith("Part 1: Partly right.")
+    assert tokens == 100 * len(graded_parts)
+
+
+def test_streamed_evaluation_is_parsed_incrementally():
+    full = '{"score": 7.5, "feedback": "You missed \\"osmosis\\".\\nRevise it."}'
+    seen = [parse_partial_evaluation(full[:end]) for end in range(len(full) + 1)]
+
+    assert seen[full.index("7.5") + 2].score is None  # number not yet terminated
+    assert seen[-1].score == 7.5
+    assert seen[-1].feedback == 'You missed "osmosis".\nRevise it.'
+    feedbacks = [s.feedback for s in seen]
+    assert all(b.startswith(a) for a, b in zip(feedbacks, feedbacks[1:]))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_llm_client_lifecycle(monkeypatch):
+    from app.config import settings
+    from app.utils.evaluator import GroqBackend
+
+    monkeypatch.setattr(settings, "LLM_WARMUP_ON_STARTUP", False)
+    backend = GroqBackend()
+    assert backend.pool_stats() == {"open": False}
+
+    await backend.start()
+    stats = backend.pool_stats()
+    assert stats["open"] and stats["connections"] == 0
+    assert stats["max_connections"] == settings.LLM_HTTP_MAX_CONNECTIONS
+
+    await backend.close()
+    assert backend.pool_stats() == {"open": False}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hedger_duplicates_slow_calls_and_charges_the_loser():
+    hedger = Hedger(enabled=True, percentile=90, min_samples=5)
+    hedger.latencies.extend([0.01] * 10)
+    cancelled = []
+
+    async def slow_primary():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "slow", 100
+
+    async def fast_hedge():
+        await asyncio.sleep(0.02)
+        return "fast", 80
+
+    result, tokens = await hedger.run(slow_primary, fast_hedge, loser_tokens=50)
+    await asyncio.sleep(0)
+
+    assert result == "fast"
+    assert tokens == 80 + 50
+    assert cancelled == [True]
+    assert hedger.hedged == 1 and hedger.hedge_wins == 1
+
+    # Without enough samples nothing is hedged.
+    cold = Hedger(enabled=True, percentile=90, min_samples=5)
+    assert await cold.run(fast_hedge, slow_primary, loser_tokens=50) == ("fast", 80)
+    assert cold.hedged == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_winning_hedge_is_credited_to_the_hedge_model(monkeypatch):
+    from app.config import settings
+
+    groq_backend = EvaluationService.get_backend("groq")
+    hedger = Hedger(enabled=True, percentile=90, min_samples=5)
+    hedger.latencies.extend([0.01] * 10)
+    monkeypatch.setattr("app.utils.evaluator.hedger", hedger)
+    monkeypatch.setattr(
+        "app.utils.evaluator.dispatcher",
+        LLMDispatcher(max_concurrency=2, requests_per_minute=0, tokens_per_minute=0),
+    )
+    monkeypatch.setattr(settings, "LLM_HEDGE_MODEL", "hedge-model")
+    monkeypatch.setattr(evaluation_cache, "persistent", False)
+
+    async def fake_complete(messages, model):
+        if model != "hedge-model":
+            await asyncio.sleep(1)
+        return EvaluationResponse(score=2.0, feedback=model, model=model), 10
+
+    monkeypatch.setattr(groq_backend, "_complete", fake_complete)
+    item = EvaluationItem(
+        qid=1, question=f"hedge-{uuid.uuid4()}", student_answer="a", max_marks=5
+    )
+    response, _ = await groq_backend.evaluate(item)
+    assert response.model == "hedge-model"
+
+    await EvaluationService.remember(groq_backend, item, response)
+    hedge_key = EvaluationService.cache_key(item, groq_backend, "hedge-model")
+    primary_key = EvaluationService.cache_key(item, groq_backend)
+    assert await evaluation_cache.get_many([hedge_key, primary_key]) == {
+        hedge_key: (2.0, "hedge-model")
+    }
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_hedge_is_skipped_when_the_rate_limits_have_no_room():
+    hedger = Hedger(enabled=True, percentile=90, min_samples=5)
+    hedger.latencies.extend([0.01] * 10)
+    dispatcher = LLMDispatcher(
+        max_concurrency=2, requests_per_minute=1, tokens_per_minute=0
+    )
+    hedges = []
+
+    async def primary():
+        await asyncio.sleep(0.05)
+        return "primary", 100
+
+    async def hedge():
+        hedges.append(True)
+        return "hedge", 80
+
+    # The only request of the minute went to the primary.
+    await dispatcher.request_limiter.acquire()
+    result = await hedger.run(
+        primary, hedge, loser_tokens=50, admit=lambda: dispatcher.try_admit(50)
+    )
+
+    assert result == ("primary", 100)
+    assert hedges == [] and hedger.hedged == 0 and hedger.skipped == 1
+
+
+def test_router_sends_short_low_mark_answers_to_the_fast_model(monkeypatch):
+    from app.config import settings
+    from app.utils.routing import ModelRouter, RoutingRule, RoutingRules
+
+    short = EvaluationItem(
+        qid=1,
+        question="Capital of Japan?",
+        student_answer="Tokyo",
+        max_marks=1.0,
+        teacher_answer="Tokyo",
+    )
+    essay = short.model_copy(
+        update={"max_marks": 10.0, "student_answer": "word " * 400}
+    )
+
+    assert ModelRouter.route(short) is None  # routing is off by default
+    monkeypatch.setattr(settings, "LLM_ROUTING_ENABLED", True)
+    assert ModelRouter.route(short) == settings.LLM_FAST_MODEL
+    assert ModelRouter.route(essay) is None
+
+    paper_rules = RoutingRules(
+        rules=[RoutingRule(model="small", question_type="short", max_marks=5)],
+        default_model="large",
+    )
+    assert ModelRouter.route(short, paper_rules) == "small"
+    assert ModelRouter.route(essay, paper_rules) == "large"
+
+    groq_backend = EvaluationService.get_backend("groq")
+    routed = short.model_copy(update={"model": "small"})
+    assert EvaluationService.cache_key(routed, groq_backend) != (
+        EvaluationService.cache_key(short, groq_backend)
+    )
+
+
+def test_clusterer_groups_near_duplicate_answers():
+    from app.utils.clustering import AnswerClusterer
+
+    answers = [
+        "Photosynthesis converts light energy into chemical energy in plants.",
+        "Photosynthesis converts light energy into chemical energy in plants!",
+        "The mitochondria is the powerhouse of the cell.",
+        "photosynthesis converts  light energy into chemical energy in plants",
+        "Photosynthesis does not convert light energy into chemical energy in plants.",
+    ]
+
+    clusters = AnswerClusterer(threshold=0.9).cluster(answers)
+
+    assert clusters[0] == [0, 1, 3]
+    assert [2] in clusters and [4] in clusters
+    assert sorted(i for cluster in clusters for i in cluster) == list(range(5))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_fair_scheduler_interleaves_tenants_and_serves_short_work_first():
+    from app.utils.scheduling import FairScheduler
+
+    scheduler = FairScheduler(capacity=1, weights={"heavy": 1.0, "light": 1.0})
+    order: list[tuple[str, int]] = []
+
+    async def task(tenant: str, cost: int) -> None:
+        await scheduler.acquire(tenant, cost)
+        order.append((tenant, cost))
+        await asyncio.sleep(0)
+        scheduler.release(tenant)
+
+    # The bulk run holds the only slot while the rest of its work and a colleague's
+    # single request queue up behind it.
+    await scheduler.acquire("heavy", 100)
+    bulk = [asyncio.create_task(task("heavy", cost)) for cost in (300, 200, 400)]
+    single = asyncio.create_task(task("light", 150))
+    await asyncio.sleep(0)
+    scheduler.release("heavy")
+    await asyncio.gather(*bulk, single)
+
+    assert order == [("light", 150), ("heavy", 200), ("heavy", 300), ("heavy", 400)]
+
+    stats = scheduler.stats()
+    assert stats["in_use"] == 0
+    assert stats["tenants"]["heavy"]["served"] == 4
+    assert stats["tenants"]["light"]["queued"] == 0
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_dispatcher_calls_stop_at_the_deadline_and_charge_their_estimate():
+    from app.utils.evaluator import DeadlineExceededError
+    from app.utils.scheduling import tenant_scope
+
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    dispatcher = LLMDispatcher(
+        max_concurrency=2,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        max_retries=3,
+        circuit_breaker=breaker,
+        call_timeout=10,
+    )
+    charged = []
+
+    async def slow_call():
+        await asyncio.sleep(10)
+        return "late", 100
+
+    started = time.monotonic()
+    with tenant_scope("t@x.com", time.monotonic() + 0.05, charged.append):
+        with pytest.raises(DeadlineExceededError):
+            await dispatcher.run(slow_call, estimated_tokens=40)
+        # Past the deadline nothing more is sent.
+        with pytest.raises(DeadlineExceededError):
+            await dispatcher.run(slow_call, estimated_tokens=40)
+
+    # A call cancelled mid-flight is charged its estimate too.
+    with tenant_scope("t@x.com", on_abandoned=charged.append):
+        task = asyncio.create_task(dispatcher.run(slow_call, estimated_tokens=30))
+    await asyncio.sleep(0.01)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    assert time.monotonic() - started < 1
+    assert charged == [40, 30]
+    assert dispatcher.retried == 0
+    assert breaker.failures == 0  # running out of time says nothing of the provider